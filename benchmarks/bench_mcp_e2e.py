@@ -0,0 +1,311 @@
+"""End-to-end benchmark of the MCP tools over streamable HTTP.
+
+Drives /mcp through realistic ordering sessions, one MCP session each:
+
+    find_nearby_stores -> get_menu -> search_menu_items -> add_to_cart (x2)
+    -> remove_from_cart -> get_cart -> price_order -> validate_order
+    -> place_order (DRY_RUN) -> clear_cart
+
+By default the script starts the local Domino's API stand-in
+(dominos_mcp.fake_api) and a server pointed at it, each in a subprocess
+with a throwaway config, database and audit log. Pass --url to benchmark
+a server that is already running instead; it must be in DRY_RUN mode.
+
+Reports p50/p95/p99 latency and throughput per tool and writes the
+results as JSON; --compare prints the change against an earlier run.
+
+    PYTHONPATH=src python benchmarks/bench_mcp_e2e.py --sessions 200 --concurrency 20
+    PYTHONPATH=src python benchmarks/bench_mcp_e2e.py --compare benchmarks/results/v1.1.0.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOOLS = [
+    "find_nearby_stores",
+    "get_menu",
+    "search_menu_items",
+    "add_to_cart",
+    "remove_from_cart",
+    "get_cart",
+    "price_order",
+    "validate_order",
+    "place_order",
+    "clear_cart",
+]
+
+SEARCHES = ["pepperoni pizza", "hot wings", "garlic bread", "coke", "lava cake"]
+
+
+class Recorder:
+    """Per-tool latencies and failures of one benchmark run."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.failures: dict[str, int] = defaultdict(int)
+
+    async def call(self, session: ClientSession, tool: str, **arguments) -> dict:
+        start = time.perf_counter()
+        try:
+            result = await session.call_tool(f"tool_{tool}", arguments)
+            data = json.loads(result.content[0].text)
+        except Exception:
+            self.errors[tool] += 1
+            raise
+        finally:
+            self.latencies[tool].append(time.perf_counter() - start)
+        if not data.get("success", True):
+            self.errors[tool] += 1
+        return data
+
+
+async def run_session(url: str, recorder: Recorder, n: int) -> None:
+    """One ordering session from store lookup to a dry-run order."""
+    # Stateless (multi-worker) servers issue no MCP session IDs; name our own
+    headers = {"X-Session-Id": f"bench-{os.getpid()}-{n}"}
+    async with streamablehttp_client(url, headers=headers) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            call = recorder.call
+
+            stores = await call(session, "find_nearby_stores")
+            await call(session, "get_menu", category="Pizza")
+            found = await call(session, "search_menu_items", query=SEARCHES[n % len(SEARCHES)])
+            codes = [item["code"] for item in found.get("results", [])[:2]]
+            if not stores.get("stores") or not codes:
+                raise RuntimeError("no store or menu item to order")
+            await call(session, "add_to_cart", item_code=codes[0], quantity=2)
+            await call(session, "add_to_cart", item_code=codes[-1])
+            await call(session, "remove_from_cart", cart_index=1)
+            await call(session, "get_cart")
+            await call(session, "price_order")
+            await call(session, "validate_order")
+            await call(session, "place_order", confirm_order="YES_PLACE_MY_ORDER")
+            await call(session, "clear_cart")
+
+
+async def run(
+    url: str, sessions: int, concurrency: int, offset: int = 0
+) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(n: int) -> None:
+        async with limit:
+            try:
+                await run_session(url, recorder, offset + n)
+            except Exception as e:
+                # The MCP client's task groups wrap the actual error
+                while isinstance(e, ExceptionGroup) and len(e.exceptions) == 1:
+                    e = e.exceptions[0]
+                recorder.failures[f"{type(e).__name__}: {e}"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(sessions)))
+    return recorder, time.perf_counter() - start
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict[str, Any]:
+    tools = {}
+    for tool in TOOLS:
+        values = sorted(recorder.latencies.get(tool, []))
+        if not values:
+            continue
+        tools[tool] = {
+            "calls": len(values),
+            "errors": recorder.errors.get(tool, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2),
+            "throughput_per_s": round(len(values) / elapsed, 2),
+        }
+    calls = sum(t["calls"] for t in tools.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "sessions_failed": sum(recorder.failures.values()),
+        "failures": dict(recorder.failures),
+        "calls": calls,
+        "calls_per_s": round(calls / elapsed, 2),
+        "tools": tools,
+    }
+
+
+def print_report(summary: dict[str, Any], baseline: Optional[dict[str, Any]] = None) -> None:
+    print(
+        f"{summary['calls']} calls in {summary['elapsed_s']} s "
+        f"({summary['calls_per_s']} calls/s), {summary['sessions_failed']} sessions failed"
+    )
+    for reason, count in summary["failures"].items():
+        print(f"  {count} x {reason}")
+    header = f"{'tool':<20}{'calls':>7}{'errors':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'calls/s':>10}"
+    if baseline:
+        header += f"{'p50 Δ':>9}{'p95 Δ':>9}"
+    print(header)
+    for tool, t in summary["tools"].items():
+        line = (
+            f"{tool:<20}{t['calls']:>7}{t['errors']:>7}{t['p50_ms']:>10.2f}"
+            f"{t['p95_ms']:>10.2f}{t['p99_ms']:>10.2f}{t['throughput_per_s']:>10.2f}"
+        )
+        base = baseline["results"]["tools"].get(tool) if baseline else None
+        if base:
+            for key in ("p50_ms", "p95_ms"):
+                change = (t[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+                line += f"{change:>+8.1f}%"
+        print(line)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{process.args} exited with {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Nothing listening on port {port} after {timeout} s")
+
+
+@contextmanager
+def local_stack(args: argparse.Namespace):
+    """Start the fake Domino's API and a DRY_RUN server; yields the /mcp URL."""
+    with tempfile.TemporaryDirectory(prefix="dominos-bench-") as tmp:
+        env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, "src"))
+        api_port, mcp_port = _free_port(), _free_port()
+
+        with open(os.path.join(ROOT, "config.json.example")) as f:
+            config = json.load(f)
+        config["server"]["dominos_api_url"] = f"http://127.0.0.1:{api_port}"
+        config["server"]["per_session_state"] = True
+        config_path = os.path.join(tmp, "config.json")
+        with open(config_path, "w") as f:
+            json.dump(config, f)
+
+        api = subprocess.Popen(
+            [
+                sys.executable, "-m", "dominos_mcp.fake_api",
+                "--port", str(api_port),
+                "--latency-ms", str(args.api_latency_ms),
+                "--jitter-ms", str(args.api_jitter_ms),
+                "--seed", "1",
+            ],
+            env=env,
+        )
+        server_env = dict(
+            env,
+            CONFIG_PATH=config_path,
+            DRY_RUN="true",
+            HOST="127.0.0.1",
+            PORT=str(mcp_port),
+            WORKERS=str(args.workers),
+            LOG_LEVEL="WARNING",
+            DOMINOS_DB_PATH=os.path.join(tmp, "state.db"),
+            DOMINOS_STATE_PATH=os.path.join(tmp, "state.json"),
+            LOG_PATH=os.path.join(tmp, "orders.log"),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "dominos_mcp.server"], env=server_env
+        )
+        try:
+            _wait_for_port(api_port, api)
+            _wait_for_port(mcp_port, server)
+            yield f"http://127.0.0.1:{mcp_port}/mcp"
+        finally:
+            for process in (server, api):
+                process.terminate()
+                process.wait(timeout=10)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", help="benchmark a running server's /mcp endpoint")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5, help="untimed sessions first")
+    parser.add_argument("--workers", type=int, default=1, help="server workers (local stack)")
+    parser.add_argument("--api-latency-ms", type=float, default=50.0)
+    parser.add_argument("--api-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "latest.json"))
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    async def bench(url: str) -> dict[str, Any]:
+        if args.warmup:
+            await run(url, args.warmup, min(args.warmup, args.concurrency))
+        return summarize(*await run(url, args.sessions, args.concurrency, args.warmup))
+
+    if args.url:
+        summary = asyncio.run(bench(args.url))
+    else:
+        with local_stack(args) as url:
+            summary = asyncio.run(bench(url))
+
+    print_report(summary, baseline)
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    if args.url:
+        for key in ("workers", "api_latency_ms", "api_jitter_ms"):
+            settings.pop(key)
+    report = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "settings": settings,
+        "results": summary,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
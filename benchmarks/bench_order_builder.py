@@ -0,0 +1,175 @@
+"""Benchmark building an order from the cart: per-call rebuild vs OrderTemplate.
+
+The legacy path constructs the pizzapi address, customer, store and the
+full base payload on every call; the template builds them once from the
+config. Both produce the same payload, which is checked first.
+
+Every validate or price cache miss also needs the store's menu for the
+product records. That step is measured too: downloading and decoding
+the menu (from the Domino's API stand-in, in process, so without any
+network latency) against reading the cached MenuEntry.
+
+    PYTHONPATH=src python benchmarks/bench_order_builder.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import timeit
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pizzapi import Address as PizzaAddress
+from pizzapi import Customer as PizzaCustomer
+from pizzapi import Menu, Store
+from pizzapi.urls import Urls
+
+from dominos_mcp import client as dominos
+from dominos_mcp import fake_api, menu_store
+from dominos_mcp.config import DominosConfig
+from dominos_mcp.state import CartItem, ServerState
+from dominos_mcp.tools.order import OrderTemplate, _Order
+from dominos_mcp.tools.store import get_menu_entry
+from menu_fixture import make_menu
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _LegacyOrder(_Order):
+    def __init__(self, store, customer, address, menu, country):
+        self.store = store
+        self.menu = menu
+        self.customer = customer
+        self.address = address
+        self.urls = Urls(country)
+        self.country = country
+        self.data = {
+            "Address": {
+                "Street": address.street,
+                "City": address.city,
+                "Region": address.region,
+                "PostalCode": address.zip,
+                "Type": "House",
+            },
+            "Coupons": [], "CustomerID": "", "Extension": "", "OrderChannel": "OLO",
+            "OrderID": "", "NoCombine": True, "OrderMethod": "Web", "OrderTaker": None,
+            "Payments": [], "Products": [], "Market": "", "Currency": "",
+            "ServiceMethod": "Delivery", "Tags": {}, "Version": "1.0",
+            "SourceOrganizationURI": "order.dominos.com", "LanguageCode": "en",
+            "Partners": {}, "NewUser": True, "metaData": {}, "Amounts": {},
+            "BusinessDate": "", "EstimatedWaitMinutes": "", "PriceOrderTime": "",
+            "AmountsBreakdown": {},
+        }
+
+
+def legacy_new_order(config: DominosConfig, store_id: str, menu) -> _Order:
+    country = config.address.country
+    address = PizzaAddress(
+        config.address.street,
+        config.address.city,
+        config.address.region,
+        config.address.postal_code,
+        country=country,
+    )
+    customer = PizzaCustomer(
+        config.customer.first_name,
+        config.customer.last_name,
+        config.customer.email,
+        config.customer.phone,
+    )
+    store = Store(data={"StoreID": store_id}, country=country)
+    order = _LegacyOrder(store, customer, address, menu, country)
+    if country.lower() == "ca":
+        order.data["SourceOrganizationURI"] = "order.dominos.ca"
+        order.data["Market"] = "CANADA"
+    order.data.update(
+        Email=customer.email,
+        FirstName=customer.first_name,
+        LastName=customer.last_name,
+        Phone=customer.phone,
+    )
+    return order
+
+
+def fill(order: _Order, cart: list[CartItem]) -> _Order:
+    for item in cart:
+        for _ in range(item.quantity):
+            order.add_item(item.code, options=item.options)
+    return order
+
+
+async def _menu_step(
+    config: DominosConfig, repeat: int, number: int
+) -> tuple[float, float, float]:
+    """Best mean time in us of: menu download + decode, cached menu, cart build."""
+    dominos.configure(30.0, "http://fake-dominos")
+    client = dominos.get_client()
+    await client._http.aclose()
+    client._http = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_api.create_app())
+    )
+    menu_store.configure(False)
+    state = ServerState(store_id="10001")
+    entry = await get_menu_entry(state, config, "10001")  # primes the cache
+    template = OrderTemplate(config)
+    cart = [CartItem(code=c, quantity=1) for c in list(entry.variants)[:3]]
+
+    async def best_us(call, n: int) -> float:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(n):
+                await call()
+            times.append((time.perf_counter() - start) / n * 1e6)
+        return min(times)
+
+    async def build_cached():
+        fill(template.new_order("10001", await get_menu_entry(state, config, "10001")), cart)
+
+    try:
+        fetched = await best_us(lambda: client.get_menu("10001", "ca"), max(1, number // 100))
+        cached = await best_us(lambda: get_menu_entry(state, config, "10001"), number)
+        built = await best_us(build_cached, number)
+    finally:
+        await client._http.aclose()
+    return fetched, cached, built
+
+
+def main(repeat: int = 5, number: int = 2000) -> None:
+    with open(os.path.join(ROOT, "config.json.example")) as f:
+        config = DominosConfig(**json.load(f))
+    menu = Menu(make_menu(), "ca")
+    codes = [c for c in menu.variants][:3]
+    cart = [CartItem(code=c, quantity=1) for c in codes]
+    template = OrderTemplate(config)
+
+    legacy = fill(legacy_new_order(config, "10001", menu), cart).data
+    templated = fill(template.new_order("10001", menu), cart).data
+    if legacy != templated:
+        raise SystemExit("template payload differs from the legacy payload")
+
+    def best_us(stmt) -> float:
+        return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number * 1e6
+
+    legacy_empty = best_us(lambda: legacy_new_order(config, "10001", menu))
+    template_empty = best_us(lambda: template.new_order("10001", menu))
+    legacy_cart = best_us(lambda: fill(legacy_new_order(config, "10001", menu), cart))
+    template_cart = best_us(lambda: fill(template.new_order("10001", menu), cart))
+
+    print(f"cart lines:               {len(cart)}")
+    print(f"legacy empty order:       {legacy_empty:8.2f} us")
+    print(f"template empty order:     {template_empty:8.2f} us  ({legacy_empty / template_empty:.1f}x)")
+    print(f"legacy order with cart:   {legacy_cart:8.2f} us")
+    print(f"template order with cart: {template_cart:8.2f} us  ({legacy_cart / template_cart:.1f}x)")
+
+    fetched, cached, built = asyncio.run(_menu_step(config, repeat, number))
+    print(f"menu download + decode:   {fetched:8.2f} us  (before: every validate/price miss)")
+    print(f"cached menu entry:        {cached:8.2f} us  ({fetched / cached:.0f}x)")
+    print(f"cached menu + cart build: {built:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
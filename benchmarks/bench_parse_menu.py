@@ -0,0 +1,57 @@
+"""Benchmark _parse_menu category classification on a real-size menu.
+
+Compares the single-pass regex classifier against the previous nested
+any() scan and checks both assign every variant to the same category.
+
+    PYTHONPATH=src python benchmarks/bench_parse_menu.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pizzapi import Menu
+
+from dominos_mcp.tools.store import CATEGORY_KEYWORDS, _classify, _parse_menu
+from menu_fixture import make_menu
+
+
+def _legacy_classify(name: str, product_type: str, tags) -> str:
+    for cat_name, keywords in CATEGORY_KEYWORDS.items():
+        if any(
+            kw.lower() in product_type.lower()
+            or kw.lower() in name.lower()
+            or kw.lower() in str(tags).lower()
+            for kw in keywords
+        ):
+            return cat_name
+    return "Other"
+
+
+def main(repeat: int = 5, number: int = 20) -> None:
+    menu = Menu(make_menu(), "ca")
+    rows = [
+        (v.get("Name", ""), v.get("ProductType", ""), v.get("Tags", {}))
+        for v in menu.variants.values()
+    ]
+
+    mismatches = [r for r in rows if _classify(*r) != _legacy_classify(*r)]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} variants classified differently: {mismatches[:3]}")
+
+    def best_ms(stmt) -> float:
+        return min(timeit.repeat(stmt, repeat=repeat, number=number)) / number * 1000
+
+    legacy = best_ms(lambda: [_legacy_classify(*r) for r in rows])
+    single = best_ms(lambda: [_classify(*r) for r in rows])
+    parse = best_ms(lambda: _parse_menu(menu))
+
+    print(f"variants:                 {len(rows)}")
+    print(f"legacy classification:    {legacy:8.2f} ms")
+    print(f"single-pass regex:        {single:8.2f} ms  ({legacy / single:.1f}x)")
+    print(f"full _parse_menu:         {parse:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Deterministic, real-size Domino's menu payload for benchmarks.
+
+Mirrors the shape of a /power/store/{id}/menu response from a Canadian
+store: ~230 products with size variants (~600 variants), coupons,
+and the per-variant Tags dicts that make category matching expensive.
+"""
+import random
+
+PRODUCT_LINES = [
+    # (ProductType, count, sizes, name words, tag extras)
+    ("Pizza", 60, ["10", "12", "14", "16"], ["Pepperoni", "Hawaiian", "Deluxe", "ExtravaganZZa", "MeatZZa", "Pacific Veggie", "Philly Cheese Steak", "Buffalo Chicken", "Honolulu", "Wisconsin 6 Cheese", "Spinach Feta", "Cali Chicken Bacon Ranch"], {"Specialty": True, "Promotion": "", "Crust": "HANDTOSS"}),
+    ("Wings", 20, ["8PC", "14PC", "32PC"], ["Hot", "BBQ", "Honey BBQ", "Garlic Parmesan", "Mango Habanero", "Plain", "Sweet Mango", "Spicy Jamaican Jerk"], {"BoneIn": True, "Sauce": "HOTSAUCE"}),
+    ("Pasta", 15, ["BREAD", "BOWL"], ["Chicken Alfredo", "Italian Sausage Marinara", "Chicken Carbonara", "Pasta Primavera", "Chicken & Bacon Carbonara"], {"DefaultSides": ""}),
+    ("Bread", 20, ["8PC", "16PC"], ["Garlic", "Cheesy", "Parmesan", "Cinnamon", "Stuffed Cheesy", "Bacon Jalapeno"], {"Bread": True, "OptionQtys": ["0", "1"]}),
+    ("Drinks", 35, ["355ML", "591ML", "2LTR"], ["Coke", "Diet Coke", "Coke Zero", "Sprite", "Canada Dry Ginger Ale", "Nestea", "Dasani Water", "Minute Maid"], {"BevSize": "", "Sodium": True}),
+    ("Dessert", 20, ["8PC", "2PC"], ["Chocolate Lava Crunch Cake", "Marble Cookie Brownie", "Cinna Stix", "Oreo Cookie Brownie"], {"Sweet": True}),
+    ("Sides", 40, ["1PC", "4PC"], ["Ranch Dipping Cup", "Blue Cheese Cup", "Marinara Cup", "Hot Sauce Cup", "Garlic Dipping Cup", "Kicker Hot Sauce", "Salad", "Caesar Salad"], {"SideOptions": [], "Dip": True}),
+    ("GSalad", 20, ["1"], ["Classic Garden", "Chicken Caesar", "Greek"], {"Salad": True}),
+]
+
+
+def make_menu(seed: int = 20260227) -> dict:
+    rnd = random.Random(seed)
+    products: dict = {}
+    variants: dict = {}
+    for product_type, count, sizes, names, tag_extras in PRODUCT_LINES:
+        for n in range(count):
+            base = rnd.choice(names)
+            pcode = f"S_{product_type[:4].upper()}{n:03d}"
+            name = f"{base} {product_type}" if rnd.random() < 0.6 else base
+            description = (
+                f"{base} made with {rnd.choice(['fresh', 'premium', 'classic'])} "
+                f"ingredients and {rnd.choice(['mozzarella', 'provolone', 'cheddar', 'sauce'])}."
+            )
+            products[pcode] = {
+                "Code": pcode,
+                "Name": name,
+                "ProductType": product_type,
+                "Description": description,
+                "Variants": [],
+                "Tags": dict(tag_extras, NotHalfable=rnd.random() < 0.2),
+            }
+            for size in sizes:
+                code = f"{size}{pcode[2:]}"
+                price = f"{rnd.uniform(2, 30):.2f}"
+                products[pcode]["Variants"].append(code)
+                variants[code] = {
+                    "Code": code,
+                    "FlavorCode": rnd.choice(["HANDTOSS", "THIN", "BK", ""]),
+                    "Name": f"{size} {name}",
+                    "Price": price,
+                    "ProductCode": pcode,
+                    "ProductType": product_type,
+                    "SizeCode": size,
+                    "Description": "",
+                    "Tags": dict(
+                        tag_extras,
+                        Size=size,
+                        Validation=["SizeRule", "CrustRule"],
+                        PricingMethod="Default",
+                        ExtraToppings={t: "1" for t in rnd.sample("XCPSBHKORGMNJ", 4)},
+                    ),
+                    "Pricing": {"Price1-0": price, "Price2-0": price},
+                    "Local": False,
+                    "Prepared": True,
+                }
+
+    coupons = {
+        f"{9000 + i}": {
+            "Code": f"{9000 + i}",
+            "Name": f"Coupon deal {i}",
+            "Price": f"{rnd.uniform(5, 40):.2f}",
+            "Description": "Limited time offer.",
+            "Tags": {"ValidServiceMethods": ["Delivery", "Carryout"]},
+        }
+        for i in range(40)
+    }
+    return {
+        "Variants": variants,
+        "Products": products,
+        "Coupons": coupons,
+        "PreconfiguredProducts": {},
+        "Categorization": {},
+        "Misc": {"Version": "1.0", "StoreID": "10001"},
+    }
@@ -0,0 +1,168 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import IO, Optional
+
+logger = logging.getLogger(__name__)
+
+LOG_PATH = os.environ.get("LOG_PATH", "/data/orders.log")
+
+_STOP = object()
+
+
+class AuditLog:
+    """Append-only audit log written by a background thread.
+
+    `write` only timestamps the entry and queues it, so tool handlers
+    never wait on the disk. The writer thread drains the queue in
+    batches, keeps the file open, flushes after every batch and rotates
+    the file once it reaches `max_bytes` or has been open for
+    `rotate_seconds` (orders.log -> orders.log.1 ... .`backup_count`).
+    `close` writes everything still queued; it runs at shutdown and at
+    process exit.
+    """
+
+    def __init__(
+        self,
+        path: str = LOG_PATH,
+        max_bytes: int = 10 * 1024 * 1024,
+        rotate_seconds: float = 0.0,
+        backup_count: int = 5,
+        thread_name: str = "dominos-audit",
+    ):
+        self.path = path
+        self.thread_name = thread_name
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        self._size = 0
+        self._opened_at = 0.0
+        atexit.register(self.close)
+
+    def configure(self, max_bytes: int, rotate_seconds: float, backup_count: int) -> None:
+        """Set rotation limits; 0 turns size or time rotation off."""
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = max(1, backup_count)
+
+    def write(self, message: str) -> None:
+        """Queue a timestamped entry; returns immediately."""
+        timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.append(f"{timestamp} | {message}\n")
+
+    def append(self, data: str) -> None:
+        """Queue preformatted text (one or more newline-terminated lines) as is."""
+        # Under the lock, so `close` either sees this entry or a new writer
+        with self._lock:
+            self._queue.put(data)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=self.thread_name, daemon=True
+                )
+                self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write everything queued so far, then stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"Writer for {self.path} did not finish in time")
+            return
+        with self._lock:
+            # Entries queued after the writer took _STOP; no writer is left
+            # to take them unless `append` has started a new one since.
+            if self._thread is thread:
+                self._drain()
+
+    def _drain(self) -> None:
+        """Write whatever is still queued on the calling thread."""
+        lines = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                lines.append(entry)
+        if lines:
+            self._write_batch(lines)
+            self._close_file()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(entry is _STOP for entry in batch)
+            lines = [entry for entry in batch if entry is not _STOP]
+            if lines:
+                self._write_batch(lines)
+            if stop:
+                self._close_file()
+                return
+
+    def _write_batch(self, lines: list[str]) -> None:
+        try:
+            if self._file is None:
+                self._open()
+            if self._should_rotate():
+                self._rotate()
+            data = "".join(lines)
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data.encode())
+        except Exception as e:
+            logger.warning(f"Failed to write {self.path}: {e}")
+            self._close_file()
+
+    def _open(self) -> None:
+        log_dir = os.path.dirname(self.path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        self._file = open(self.path, "a")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._opened_at = time.time()
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes and self._size >= self.max_bytes:
+            return True
+        return bool(
+            self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds
+        )
+
+    def _rotate(self) -> None:
+        self._close_file()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+
+# Shared by every MCP session; rotation limits come from the config's audit section.
+AUDIT_LOG = AuditLog()
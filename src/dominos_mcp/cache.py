@@ -0,0 +1,103 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from dominos_mcp import metrics
+from dominos_mcp.upstream import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """LRU-bounded cache whose entries go stale after `ttl` seconds.
+
+    Stale entries are still served while one background task per key
+    refreshes them (stale-while-revalidate), so callers only wait on the
+    upstream for keys that have never been fetched. Concurrent misses for
+    the same key share one fetch. A named cache counts its `get_or_fetch`
+    results in dominos_mcp_cache_requests_total.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, name: str = ""):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[V, float]] = OrderedDict()
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._misses = SingleFlight()
+
+    def configure(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._evict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[V]:
+        """Return the cached value, fresh or stale, without triggering a fetch."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def is_fresh(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() - entry[1] < self.ttl
+
+    def set(self, key: str, value: V, age: float = 0.0) -> None:
+        """Store a value; `age` backdates entries restored from elsewhere (e.g. disk)."""
+        self._entries[key] = (value, time.monotonic() - age)
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def pop(self, key: str) -> Optional[V]:
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[V]]) -> V:
+        """Return the value for `key`, fetching on a miss and refreshing when stale."""
+        value = self.get(key)
+        if value is None:
+            result = "miss"
+            value = await self._misses.run(key, lambda: self._fill(key, fetch))
+        elif self.is_fresh(key):
+            result = "hit"
+        else:
+            result = "stale"
+            if key not in self._refreshing:
+                # A fresh context: the refresh outlives the call that noticed
+                # the stale entry and must not add spans to its trace.
+                self._refreshing[key] = asyncio.create_task(
+                    self._refresh(key, fetch), context=contextvars.Context()
+                )
+        if self.name:
+            metrics.CACHE_REQUESTS.inc(self.name, result)
+        return value
+
+    async def _fill(self, key: str, fetch: Callable[[], Awaitable[V]]) -> V:
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[V]]) -> None:
+        try:
+            self.set(key, await fetch())
+        except Exception as e:
+            # Keep serving the stale value; the next read retries the refresh.
+            logger.warning(f"Background refresh of {key!r} failed: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
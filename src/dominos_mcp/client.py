@@ -0,0 +1,178 @@
+import functools
+import importlib.util
+import logging
+import time
+from typing import Any, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from pizzapi import Menu
+from pizzapi.urls import COUNTRY_CANADA, Urls
+
+from dominos_mcp import metrics
+from dominos_mcp.tracing import span
+from dominos_mcp.upstream import SingleFlight, UpstreamTimeout, run_blocking
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+)
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); fall back to HTTP/1.1.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _headers(country: str) -> dict[str, str]:
+    """Request headers for a market; built once and shared, so never mutate."""
+    if country.lower() == COUNTRY_CANADA:
+        return {
+            "Accept": "application/json",
+            "Referer": "https://order.dominos.ca/en/pages/order/",
+            "Origin": "https://order.dominos.ca",
+            "User-Agent": USER_AGENT,
+            "DPZ-Language": "en",
+            "DPZ-Market": "CANADA",
+        }
+    return {
+        "Accept": "application/json",
+        "Referer": "https://order.dominos.com/en/pages/order/",
+        "User-Agent": USER_AGENT,
+    }
+
+
+class DominosClient:
+    """Shared async HTTP transport for the Domino's API.
+
+    One pooled keep-alive connection set serves store lookups, menus and
+    orders, so repeated calls skip the TCP/TLS handshake. Identical
+    concurrent store-locator, store-profile and menu requests share one
+    upstream call.
+    """
+
+    def __init__(
+        self, timeout: float = 30.0, max_connections: int = 20, base_url: str = ""
+    ):
+        # Replaces the scheme and host of pizzapi's URLs, e.g. to use the
+        # local fake API (dominos_mcp.fake_api); empty means Domino's itself.
+        self.base_url = base_url.rstrip("/")
+        self._http = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60.0,
+            ),
+        )
+        self._inflight = SingleFlight()
+
+    async def _request(
+        self, method: str, url: str, country: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        parts = urlsplit(url)
+        if self.base_url:
+            url = self.base_url + urlunsplit(("", "", parts.path, parts.query, ""))
+        endpoint = metrics.endpoint(parts.path)
+        status = "error"
+        start = time.perf_counter()
+        with span(f"upstream {method} {endpoint}") as s:
+            try:
+                r = await self._http.request(
+                    method, url, headers=_headers(country), **kwargs
+                )
+                status = str(r.status_code)
+            except httpx.TimeoutException as e:
+                status = "timeout"
+                raise UpstreamTimeout(f"Domino's API request to {url} timed out") from e
+            finally:
+                metrics.UPSTREAM_DURATION.observe(
+                    time.perf_counter() - start, method, endpoint
+                )
+                metrics.UPSTREAM_REQUESTS.inc(method, endpoint, status)
+                s.set(status=status)
+            r.raise_for_status()
+        with span("upstream.decode", bytes=len(r.content)):
+            return r.json()
+
+    async def get_json(self, url: str, country: str, **kwargs: Any) -> dict[str, Any]:
+        """GET a Domino's endpoint; `url` is a pizzapi URL template filled from kwargs."""
+        return await self._request("GET", url.format(**kwargs), country)
+
+    async def locate_stores(
+        self, line1: str, line2: str, service: str, country: str
+    ) -> list[dict[str, Any]]:
+        """Raw store-locator results for an address, nearest first.
+
+        Unfiltered: whether a store is online and open for `service` is
+        decided by the caller, since those fields change minute to minute.
+        """
+        data = await self._inflight.run(
+            ("stores", line1, line2, service, country),
+            lambda: self.get_json(
+                Urls(country).find_url(), country, line1=line1, line2=line2, type=service
+            ),
+        )
+        return data.get("Stores", [])
+
+    async def store_profile(self, store_id: str, country: str) -> dict[str, Any]:
+        """One store's profile, including its current open/online status."""
+        return await self._inflight.run(
+            ("profile", store_id, country),
+            lambda: self.get_json(Urls(country).info_url(), country, store_id=store_id),
+        )
+
+    async def get_menu(self, store_id: str, country: str, lang: str = "en") -> Menu:
+        """Fetch a store's menu; the large payload is parsed off the event loop."""
+        return await self._inflight.run(
+            ("menu", store_id, country, lang),
+            lambda: self._fetch_menu(store_id, country, lang),
+        )
+
+    async def _fetch_menu(self, store_id: str, country: str, lang: str) -> Menu:
+        data = await self.get_json(
+            Urls(country).menu_url(), country, store_id=store_id, lang=lang
+        )
+        with span("menu.decode", store_id=store_id):
+            return await run_blocking(Menu, data, country)
+
+    async def send_order(
+        self, url: str, order_data: dict[str, Any], country: str
+    ) -> dict[str, Any]:
+        """POST an order payload to the validate/price/place endpoint."""
+        return await self._request(
+            "POST",
+            url,
+            country,
+            json={"Order": order_data},
+        )
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+_client: Optional[DominosClient] = None
+_timeout = 30.0
+_base_url = ""
+
+
+def configure(timeout: float, base_url: str = "") -> None:
+    """Set the request timeout and API base URL used when the shared client is created."""
+    global _timeout, _base_url
+    _timeout = timeout
+    _base_url = base_url
+
+
+def get_client() -> DominosClient:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = DominosClient(timeout=_timeout, base_url=_base_url)
+        logger.info(
+            f"Domino's HTTP client ready (HTTP/2: {'on' if HTTP2_AVAILABLE else 'off'})"
+        )
+        if _base_url:
+            logger.warning(f"Using Domino's API stand-in at {_base_url}")
+    return _client
@@ -42,6 +42,39 @@ class ServerConfig(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
     log_level: str = "INFO"
+    upstream_workers: int = 8  # threads for blocking Domino's API calls
+    upstream_timeout_seconds: float = 30.0
+    dominos_api_url: str = ""  # e.g. http://127.0.0.1:8001 for the bundled fake API
+    per_session_state: bool = False  # separate cart/store per MCP session
+    session_idle_seconds: float = 3600.0
+    state_save_debounce_seconds: float = 0.5  # coalesces bursts of cart writes
+
+
+class CacheConfig(BaseModel):
+    menu_ttl_seconds: float = 900.0  # stale menus are refreshed in the background
+    menu_max_stores: int = 32
+    persist_menus: bool = True  # keep parsed menus in the state database
+    store_status_ttl_seconds: float = 60.0  # open/closed and wait times
+    store_identity_ttl_seconds: float = 86400.0  # store IDs, addresses, locations
+    store_lookup_max_addresses: int = 256
+    persist_store_lookups: bool = True  # share store lookups across workers and restarts
+    prewarm_store_lookup: bool = True  # look up the config address at startup
+    order_validation_ttl_seconds: float = 120.0  # reuse a validate response for an unchanged cart
+
+
+class AuditConfig(BaseModel):
+    max_bytes: int = 10 * 1024 * 1024  # rotate the audit log at this size (0 = never)
+    rotate_seconds: float = 0.0  # also rotate after this long (0 = never)
+    backup_count: int = 5  # rotated files kept: orders.log.1 ... orders.log.N
+
+
+class TracingConfig(BaseModel):
+    enabled: bool = False  # one trace per tool call, one span per stage
+    exporter: str = "jsonl"  # jsonl (file) or otlp (collector)
+    path: str = "/data/traces.jsonl"  # jsonl; rotated with the audit section's limits
+    otlp_endpoint: str = "http://localhost:4318"  # otlp; spans are POSTed to /v1/traces
+    sample_rate: float = 1.0  # fraction of tool calls traced
+    slow_threshold_ms: float = 0.0  # only export calls at least this slow
 
 
 class DominosConfig(BaseModel):
@@ -50,6 +83,9 @@ class DominosConfig(BaseModel):
     payment: Payment
     preferences: Preferences = Field(default_factory=Preferences)
     server: ServerConfig = Field(default_factory=ServerConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    audit: AuditConfig = Field(default_factory=AuditConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
 
 
 def load_config(path: Optional[str] = None) -> DominosConfig:
@@ -0,0 +1,171 @@
+"""Local stand-in for the Domino's ordering API, for load tests and benchmarks.
+
+Serves the store-locator, store profile, menu, validate, price and place
+endpoints from recorded fixtures, with configurable latency, jitter and
+injected errors. Nothing is ever ordered.
+
+    python -m dominos_mcp.fake_api --port 8001 --latency-ms 80 --jitter-ms 40
+
+Point the server at it with "dominos_api_url": "http://127.0.0.1:8001"
+in the config's server section.
+"""
+import asyncio
+import gzip
+import itertools
+import json
+import logging
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+@dataclass
+class FakeSettings:
+    latency_ms: float = 0.0  # added to every response
+    jitter_ms: float = 0.0  # latency varies uniformly by +/- this much
+    error_rate: float = 0.0  # fraction of requests answered with HTTP 503
+    tax_rate: float = 0.15
+    delivery_fee: float = 4.99
+    seed: Optional[int] = None
+
+
+def _read_json(directory: str, name: str) -> Any:
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return json.load(f)
+    with gzip.open(path + ".gz", "rb") as f:
+        return json.load(f)
+
+
+class FakeDominos:
+    """Fixture data plus the order pricing rules of the fake API."""
+
+    def __init__(self, settings: FakeSettings, fixtures_dir: str = FIXTURES_DIR):
+        self.settings = settings
+        self.stores = _read_json(fixtures_dir, "store_locator.json")
+        menu = _read_json(fixtures_dir, "menu.json")
+        self.prices = {
+            code: float(variant.get("Price") or 0)
+            for code, variant in menu.get("Variants", {}).items()
+        }
+        # The menu is the largest response; serialize it once.
+        self.menu_body = json.dumps(menu, separators=(",", ":")).encode()
+        self.random = random.Random(settings.seed)
+        self.order_ids = itertools.count(1)
+
+    async def delay_or_fail(self) -> Optional[Response]:
+        s = self.settings
+        delay = s.latency_ms + self.random.uniform(-s.jitter_ms, s.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if s.error_rate and self.random.random() < s.error_rate:
+            return JSONResponse({"Status": -1, "Error": "Injected failure"}, 503)
+        return None
+
+    def check(self, order: dict[str, Any], priced: bool) -> dict[str, Any]:
+        """Validate (and optionally price) an order payload like Domino's does."""
+        order = dict(order)
+        status_items = []
+        subtotal = 0.0
+        products = []
+        for product in order.get("Products", []):
+            product = dict(product, Status=0)
+            code = product.get("Code")
+            if code not in self.prices:
+                product["Status"] = -1
+                status_items.append({"Code": "InvalidProduct", "PulseCode": 1})
+            subtotal += self.prices.get(code, 0.0) * int(product.get("Qty", 1))
+            products.append(product)
+        order["Products"] = products
+        order["StatusItems"] = status_items
+        order["Status"] = -1 if status_items else 1
+        order["EstimatedWaitMinutes"] = "25-35"
+
+        if priced:
+            fee = (
+                self.settings.delivery_fee
+                if order.get("ServiceMethod") == "Delivery"
+                else 0.0
+            )
+            tax = round((subtotal + fee) * self.settings.tax_rate, 2)
+            total = round(subtotal + fee + tax, 2)
+            order["Amounts"] = {
+                "Menu": round(subtotal, 2),
+                "Discount": 0,
+                "Surcharge": fee,
+                "Adjustment": 0,
+                "Net": round(subtotal + fee, 2),
+                "Tax": tax,
+                "Tax1": tax,
+                "Tax2": 0,
+                "Bottle": 0,
+                "Customer": total,
+                "Payment": total,
+            }
+            order["AmountsBreakdown"] = {
+                "FoodAndBeverage": f"{subtotal:.2f}",
+                "DeliveryFee": fee,
+                "Tax": tax,
+                "Customer": total,
+                "Savings": "0.00",
+            }
+        return {"Status": order["Status"], "StatusItems": status_items, "Order": order}
+
+
+def create_app(
+    settings: Optional[FakeSettings] = None, fixtures_dir: str = FIXTURES_DIR
+) -> Starlette:
+    fake = FakeDominos(settings or FakeSettings(), fixtures_dir)
+
+    async def store_locator(request: Request) -> Response:
+        return await fake.delay_or_fail() or JSONResponse(fake.stores)
+
+    async def store_profile(request: Request) -> Response:
+        failure = await fake.delay_or_fail()
+        if failure:
+            return failure
+        store_id = request.path_params["store_id"]
+        for store in fake.stores.get("Stores", []):
+            if str(store.get("StoreID")) == store_id:
+                return JSONResponse(store)
+        return JSONResponse({"StoreID": store_id, "IsOnlineNow": False}, 404)
+
+    async def menu(request: Request) -> Response:
+        return await fake.delay_or_fail() or Response(
+            fake.menu_body, media_type="application/json"
+        )
+
+    def order_endpoint(priced: bool, place: bool = False):
+        async def handler(request: Request) -> Response:
+            failure = await fake.delay_or_fail()
+            if failure:
+                return failure
+            body = await request.json()
+            result = fake.check(body.get("Order", {}), priced)
+            if place and result["Status"] != -1:
+                result["Order"]["OrderID"] = f"FAKE-{next(fake.order_ids)}"
+            return JSONResponse(result)
+
+        return handler
+
+    return Starlette(
+        routes=[
+            Route("/power/store-locator", store_locator),
+            Route("/power/store/{store_id}/profile", store_profile),
+            Route("/power/store/{store_id}/menu", menu),
+            Route("/power/validate-order", order_endpoint(False), methods=["POST"]),
+            Route("/power/price-order", order_endpoint(True), methods=["POST"]),
+            Route("/power/place-order", order_endpoint(True, place=True), methods=["POST"]),
+        ]
+    )
@@ -0,0 +1,43 @@
+import argparse
+
+import uvicorn
+
+from dominos_mcp.fake_api import FIXTURES_DIR, FakeSettings, create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m dominos_mcp.fake_api",
+        description="Local stand-in for the Domino's ordering API.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of requests failing with 503"
+    )
+    parser.add_argument(
+        "--fixtures",
+        default=FIXTURES_DIR,
+        help="directory with store_locator.json and menu.json[.gz]",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = FakeSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(
+        create_app(settings, args.fixtures),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
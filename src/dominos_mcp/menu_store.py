@@ -0,0 +1,76 @@
+import gzip
+import hashlib
+import json
+import logging
+import re
+import time
+from typing import Optional
+
+from dominos_mcp.state import MenuEntry
+from dominos_mcp.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Bump when MenuEntry's layout changes so old rows are ignored.
+FORMAT_VERSION = 3
+
+_SAFE_STORE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_enabled = True
+
+
+def configure(enabled: bool) -> None:
+    """Turn persisting parsed menus to the state database on or off."""
+    global _enabled
+    _enabled = enabled
+
+
+def _menu_version(entry: MenuEntry) -> str:
+    """Content hash of a parsed menu, so unchanged menus are not rewritten."""
+    blob = json.dumps([entry.search_items, entry.variants], sort_keys=True).encode()
+    return f"{FORMAT_VERSION}-{hashlib.sha1(blob).hexdigest()[:12]}"
+
+
+def load(store_id: str) -> Optional[tuple[MenuEntry, float]]:
+    """Return the persisted menu for a store and its age in seconds."""
+    if not _enabled or not _SAFE_STORE_ID.match(store_id):
+        return None
+    try:
+        row = get_storage().load_menu(store_id)
+        if row is None:
+            return None
+        fmt, payload, stored_at = row
+        if fmt != FORMAT_VERSION:
+            return None
+        data = json.loads(gzip.decompress(payload))
+        return MenuEntry(**data), max(0.0, time.time() - stored_at)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable persisted menu for store {store_id}: {e}")
+        return None
+
+
+def save(store_id: str, entry: MenuEntry) -> None:
+    """Persist a parsed menu as compressed JSON, skipping unchanged content."""
+    if not _enabled or not _SAFE_STORE_ID.match(store_id):
+        return
+    try:
+        storage = get_storage()
+        version = _menu_version(entry)
+        now = time.time()
+        if storage.menu_version(store_id) == version:
+            storage.touch_menu(store_id, now)
+            return
+        payload = gzip.compress(
+            json.dumps(
+                {
+                    "categories": entry.categories,
+                    "search_items": entry.search_items,
+                    "variants": entry.variants,
+                },
+                separators=(",", ":"),
+            ).encode(),
+            compresslevel=6,
+        )
+        storage.save_menu(store_id, FORMAT_VERSION, version, payload, now)
+    except Exception as e:
+        logger.warning(f"Failed to persist menu for store {store_id}: {e}")
@@ -0,0 +1,198 @@
+"""In-process metrics, served in the Prometheus text format at /metrics.
+
+A deliberately small subset of the Prometheus client: counters, gauges
+and histograms with labels, enough for per-tool and per-endpoint latency,
+cache hit ratios and session counts without another dependency. Each
+worker process keeps its own values.
+"""
+import bisect
+import re
+import threading
+from typing import Callable, Iterable, Optional
+
+# Seconds; covers cached tool calls (ms) up to the upstream timeout.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: tuple[str, ...]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; `collect` reads it at scrape time instead."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        collect: Optional[Callable[[], dict[tuple[str, ...], float]]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        if self.collect is not None:
+            values = self.collect()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = _labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+_STORE_IN_PATH = re.compile(r"/store/[^/]+/")
+
+
+def endpoint(path: str) -> str:
+    """Upstream URL path with the store ID templated out, as a label value."""
+    return _STORE_IN_PATH.sub("/store/{id}/", path)
+
+
+TOOL_DURATION = Histogram(
+    "dominos_mcp_tool_duration_seconds",
+    "Time spent in MCP tool handlers.",
+    ["tool"],
+)
+TOOL_CALLS = Counter(
+    "dominos_mcp_tool_calls_total",
+    "MCP tool calls by outcome (ok, error: success=false, exception).",
+    ["tool", "outcome"],
+)
+TOOLS_IN_FLIGHT = Gauge(
+    "dominos_mcp_tool_calls_in_flight",
+    "MCP tool calls currently running.",
+)
+UPSTREAM_DURATION = Histogram(
+    "dominos_mcp_upstream_request_duration_seconds",
+    "Domino's API request latency.",
+    ["method", "endpoint"],
+)
+UPSTREAM_REQUESTS = Counter(
+    "dominos_mcp_upstream_requests_total",
+    "Domino's API requests by HTTP status (or timeout/error).",
+    ["method", "endpoint", "status"],
+)
+CACHE_REQUESTS = Counter(
+    "dominos_mcp_cache_requests_total",
+    "Cache lookups by result: hit, stale (served while refreshing) or miss.",
+    ["cache", "result"],
+)
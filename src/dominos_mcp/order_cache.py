@@ -0,0 +1,45 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from dominos_mcp.cache import TTLCache
+from dominos_mcp.config import DominosConfig
+from dominos_mcp.state import ServerState
+
+
+@dataclass
+class CheckedOrder:
+    """Domino's validate or price response for one cart, ready to reuse."""
+
+    data: dict[str, Any]  # order payload with the response merged in
+    products: list[dict]  # products as sent, with their menu pricing
+    priced: bool = False  # from the price endpoint, so data["Amounts"] is exact
+
+
+# Keyed by order content, so an entry can only ever match the exact cart it
+# was checked for; shared by price_order, validate_order and place_order.
+# The TTL is replaced from the config's cache section at startup.
+CHECKED_ORDERS: TTLCache[CheckedOrder] = TTLCache(ttl=120.0, max_entries=256)
+
+
+def order_key(
+    state: ServerState, config: DominosConfig, future_time: Optional[str] = None
+) -> str:
+    """Content hash of everything that goes into a validate or price request."""
+    content = {
+        "store_id": state.store_id,
+        "cart": [asdict(item) for item in state.cart],
+        "address": config.address.model_dump(),
+        "order_type": config.preferences.order_type,
+    }
+    if future_time:
+        content["future_order_time"] = future_time
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def invalidate(state: ServerState, config: DominosConfig) -> None:
+    """Drop the checked order for the session's current cart before it changes."""
+    CHECKED_ORDERS.pop(order_key(state, config))
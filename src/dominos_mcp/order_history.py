@@ -0,0 +1,87 @@
+import logging
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from dominos_mcp.state import ServerState
+from dominos_mcp.storage import get_storage
+from dominos_mcp.tracing import span
+from dominos_mcp.upstream import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Statuses recorded by place_order
+CONFIRMED = "CONFIRMED"
+DRY_RUN = "DRY_RUN"
+FAILED = "FAILED"
+
+
+async def record(
+    state: ServerState,
+    status: str,
+    order_id: Optional[str] = None,
+    total: Optional[float] = None,
+    scheduled_for: Optional[str] = None,
+    error: Optional[str] = None,
+) -> Optional[int]:
+    """Append the session's cart to the order history; returns the order number.
+
+    Called before the cart is cleared. A history failure is logged and
+    never fails the order itself.
+    """
+    order = {
+        "created_at": time.time(),
+        "session_id": state.session_id,
+        "store_id": state.store_id,
+        "status": status,
+        "order_id": order_id,
+        "total": total,
+        "scheduled_for": scheduled_for,
+        "items": [asdict(item) for item in state.cart],
+        "error": error,
+    }
+    try:
+        with span("history.record", status=status):
+            return await run_blocking(get_storage().add_order, order)
+    except Exception as e:
+        logger.warning(f"Failed to record order history: {e}")
+        return None
+
+
+async def page(
+    session_id: str, limit: int, before: Optional[int] = None, **filters: Any
+) -> list[dict]:
+    """A session's orders newest first, older than order number `before`.
+
+    See Storage.list_orders for the filters.
+    """
+    rows = await run_blocking(
+        get_storage().list_orders, limit, before, session_id=session_id, **filters
+    )
+    return [_to_result(row) for row in rows]
+
+
+async def get(session_id: str, order_number: int) -> Optional[dict[str, Any]]:
+    """One of a session's orders; None if missing or placed by another session."""
+    row = await run_blocking(get_storage().get_order, order_number, session_id)
+    return _to_result(row) if row else None
+
+
+def _to_result(order: dict[str, Any]) -> dict[str, Any]:
+    """Order history row as returned by the history tools."""
+    placed_at = datetime.fromtimestamp(order["created_at"], timezone.utc)
+    result = {
+        "order_number": order["id"],
+        "placed_at": placed_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "store_id": order["store_id"],
+        "status": order["status"],
+        "order_id": order["order_id"],
+        "total": order["total"],
+        "items": order["items"],
+    }
+    if order["scheduled_for"]:
+        result["scheduled_for"] = order["scheduled_for"]
+    if order["error"]:
+        result["error"] = order["error"]
+    return result
@@ -0,0 +1,269 @@
+"""Opt-in profiling of the next N tool calls on a live server.
+
+Armed at startup with PROFILE_CALLS=N, or at runtime with the
+`tool_profile_tool_calls` admin tool (registered when ADMIN_TOOLS=true).
+Calls are profiled one at a time; calls that overlap a profiled one run
+normally and do not count. When the last call finishes, the result is
+written to PROFILE_DIR:
+
+- sample (default): a background thread samples the event loop thread
+  and the upstream pool threads every few milliseconds and writes
+  collapsed stacks (`profile-*.folded`, one "frame;frame;... count" line
+  per stack) for flamegraph.pl, inferno or speedscope. Each stack is
+  rooted at the tool name.
+- cprofile: deterministic cProfile of the event loop thread, written as
+  a pstats file (`profile-*.prof`) for snakeviz, flameprof or pstats.
+  Work done in upstream pool threads (menu parsing) is not included.
+
+Both modes record whole threads, and other tool calls share the event
+loop and the pool: whatever they do while a profiled call runs is
+charged to that call. So each profile comes with a `profile-*.json`
+listing, per profiled call, how many other calls overlapped it. Profile
+under light load, or read the profile with those counts in mind.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/data/profiles")
+
+MODES = ("sample", "cprofile")
+
+# Pool threads are named by dominos_mcp.upstream; idle ones sit in _worker.
+_POOL_THREAD_PREFIX = "dominos-upstream"
+
+_PACKAGE_ROOT = re.compile(r"(?:site-packages|dist-packages|/src|/lib/python3\.\d+)/(.+)$")
+
+
+class ProfilerBusy(ValueError):
+    """Raised when arming a profiler that is still profiling earlier calls."""
+
+
+@functools.lru_cache(maxsize=8192)
+def _frame_label(code) -> str:
+    """`function (path.py:line)`, with the path relative to its package root."""
+    match = _PACKAGE_ROOT.search(code.co_filename)
+    path = match.group(1) if match else os.path.basename(code.co_filename)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """Profiles a configured number of upcoming tool calls, then writes the result."""
+
+    def __init__(self, output_dir: str = PROFILE_DIR):
+        self.output_dir = output_dir
+        self.mode = "sample"
+        self.tool = ""
+        self.interval = 0.005
+        self.output: Optional[str] = None
+        self._remaining = 0
+        self._profiled = 0
+        self._busy = False
+        # Other calls running since arming; overlaps of the current and past profiled calls
+        self._running = 0
+        self._overlap = 0
+        self._overlaps: list[int] = []
+        # (tool name, event loop thread ident) while a sampled call runs
+        self._capture: Optional[tuple[str, int]] = None
+        self._stacks: Counter = Counter()
+        self._profiles: list[cProfile.Profile] = []
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def remaining(self) -> int:
+        """Calls still to be profiled by the current run; 0 when idle."""
+        return self._remaining
+
+    def arm(
+        self, calls: int, mode: str = "sample", tool: str = "", interval_ms: float = 5.0
+    ) -> str:
+        """Profile the next `calls` tool calls (only `tool`'s, if given).
+
+        Returns the path the result will be written to. Raises ValueError
+        for invalid settings and ProfilerBusy if already armed.
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if calls < 1:
+            raise ValueError("calls must be at least 1")
+        if self.remaining:
+            raise ProfilerBusy(
+                f"Already profiling: {self.remaining} calls left, output {self.output}"
+            )
+        self.mode = mode
+        self.tool = tool
+        self.interval = max(0.001, interval_ms / 1000)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        extension = "folded" if mode == "sample" else "prof"
+        self.output = os.path.join(
+            self.output_dir, f"profile-{stamp}-{os.getpid()}.{extension}"
+        )
+        self._stacks = Counter()
+        self._profiles = []
+        self._profiled = 0
+        self._overlaps = []
+        self._remaining = calls
+        logger.warning(
+            f"Profiling the next {calls} {tool or 'tool'} calls ({mode}) to {self.output}"
+        )
+        return self.output
+
+    def arm_from_env(self) -> None:
+        """Arm from PROFILE_CALLS / PROFILE_MODE / PROFILE_TOOL / PROFILE_INTERVAL_MS."""
+        calls = int(os.environ.get("PROFILE_CALLS", "0") or 0)
+        if calls > 0:
+            self.arm(
+                calls,
+                os.environ.get("PROFILE_MODE", "sample"),
+                os.environ.get("PROFILE_TOOL", ""),
+                float(os.environ.get("PROFILE_INTERVAL_MS", "5")),
+            )
+
+    def call(self, name: str):
+        """Context manager around one tool call; profiles it if armed and free."""
+        if not self._remaining:
+            return nullcontext()
+        if self._busy or (self.tool and name != self.tool):
+            return self._bystander()
+        return self._profile(name)
+
+    @contextmanager
+    def _bystander(self):
+        """An unprofiled call while armed, counted as overlapping the profiled ones."""
+        self._running += 1
+        if self._busy:
+            self._overlap += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+
+    @contextmanager
+    def _profile(self, name: str):
+        self._busy = True
+        self._overlap = self._running
+        profile = None
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:  # another profiler is already active
+                logger.warning(f"Cannot profile {name}: {e}")
+                profile = None
+        else:
+            self._start_sampler()
+            self._capture = (name, threading.get_ident())
+        try:
+            yield
+        finally:
+            self._capture = None
+            if profile is not None:
+                profile.disable()
+                self._profiles.append(profile)
+            self._busy = False
+            self._overlaps.append(self._overlap)
+            self._profiled += 1
+            self._remaining -= 1
+            if self._remaining == 0:
+                self._finish()
+
+    def _start_sampler(self) -> None:
+        if self._sampler is not None and self._sampler.is_alive():
+            if not self._stop.is_set():
+                return
+            self._sampler.join()  # the previous run's sampler, exiting
+        self._stop.clear()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="dominos-profiler", daemon=True
+        )
+        self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            capture = self._capture
+            if capture is not None:
+                self._sample(*capture)
+
+    def _sample(self, tool: str, loop_ident: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == loop_ident:
+                root = tool
+            elif names.get(ident, "").startswith(_POOL_THREAD_PREFIX):
+                if frame.f_code.co_name == "_worker":
+                    continue  # idle
+                root = f"{tool};[upstream pool]"
+            else:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self._stacks[root + ";" + ";".join(stack)] += 1
+
+    def _finish(self) -> None:
+        """Stop sampling and write the result off the event loop."""
+        self._stop.set()
+        result: Any = self._profiles if self.mode == "cprofile" else self._stacks
+        self._profiles, self._stacks = [], Counter()
+        summary = {
+            "mode": self.mode,
+            "tool": self.tool or None,
+            "calls": self._profiled,
+            "overlapping_calls": self._overlaps,
+        }
+        threading.Thread(
+            target=self._write,
+            args=(self.output, self.mode, result, summary, self._sampler),
+            name="dominos-profile-writer",
+        ).start()
+
+    @staticmethod
+    def _write(
+        path: str,
+        mode: str,
+        result: Any,
+        summary: dict[str, Any],
+        sampler: Optional[threading.Thread],
+    ) -> None:
+        if sampler is not None:
+            sampler.join()  # no sample may land in `result` while it is written
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if mode == "cprofile":
+                if not result:
+                    logger.warning("Profiling finished without any profiled call")
+                    return
+                pstats.Stats(*result).dump_stats(path)
+            else:
+                with open(path, "w") as f:
+                    for stack, count in sorted(result.items()):
+                        f.write(f"{stack} {count}\n")
+            with open(os.path.splitext(path)[0] + ".json", "w") as f:
+                json.dump(summary, f, indent=2)
+            overlapped = sum(1 for n in summary["overlapping_calls"] if n)
+            logger.warning(
+                f"Profile of {summary['calls']} tool calls written to {path}"
+                f" ({overlapped} overlapped other calls)"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to write profile {path}: {e}")
+
+
+# Process-wide: with several workers each one profiles its own calls.
+# The server arms it from PROFILE_CALLS once logging is set up.
+PROFILER = Profiler()
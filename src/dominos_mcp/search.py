@@ -0,0 +1,163 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Field weights: a hit in the item name outranks one in its type or description.
+NAME_WEIGHT = 3.0
+TYPE_WEIGHT = 1.5
+DESCRIPTION_WEIGHT = 1.0
+# Prefix hits ("pep" -> "pepperoni") score below whole-token hits.
+PREFIX_FACTOR = 0.6
+MIN_PREFIX = 2
+CODE_SCORE = 10.0
+# Typo matches ("peperoni" -> "pepperoni") score below exact and prefix hits.
+FUZZY_FACTOR = 0.5
+FUZZY_CACHE_SIZE = 1024
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f" {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _max_edits(token: str) -> int:
+    """Typos tolerated for a query token; short tokens must match exactly."""
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 7 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting adjacent transpositions as one edit.
+
+    Gives up early and returns limit + 1 once every path exceeds `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1]
+
+
+class MenuIndex:
+    """Inverted index over a store's menu variants.
+
+    Whole tokens, token prefixes and variant/product codes map to the
+    positions of the items containing them, so a query is a handful of
+    dict lookups instead of a scan over every variant. Query tokens with
+    no exact or prefix hit fall back to typo-tolerant matching against
+    the token vocabulary, narrowed by a trigram index.
+    """
+
+    def __init__(self, items: list[dict]):
+        self._terms: dict[str, dict[int, float]] = defaultdict(dict)
+        self._codes: dict[str, list[int]] = defaultdict(list)
+        self._grams: dict[str, list[str]] = defaultdict(list)
+        self._fuzzy_cache: dict[str, dict[int, float]] = {}
+        words: set[str] = set()
+
+        for i, item in enumerate(items):
+            for code_key in ("code", "product_code"):
+                code = item.get(code_key)
+                if code:
+                    self._codes[code.lower()].append(i)
+            for field_name, weight in (
+                ("name", NAME_WEIGHT),
+                ("category", TYPE_WEIGHT),
+                ("description", DESCRIPTION_WEIGHT),
+            ):
+                for token in tokenize(item.get(field_name, "")):
+                    words.add(token)
+                    self._add(token, i, weight)
+                    for end in range(MIN_PREFIX, len(token)):
+                        self._add(token[:end], i, weight * PREFIX_FACTOR)
+
+        for word in words:
+            for gram in _trigrams(word):
+                self._grams[gram].append(word)
+
+        self._terms = dict(self._terms)
+        self._codes = dict(self._codes)
+        self._grams = dict(self._grams)
+
+    def _add(self, term: str, i: int, weight: float) -> None:
+        postings = self._terms[term]
+        if postings.get(i, 0.0) < weight:
+            postings[i] = weight
+
+    def _fuzzy(self, token: str) -> dict[int, float]:
+        """Postings for vocabulary words within a few edits of `token`."""
+        cached = self._fuzzy_cache.get(token)
+        if cached is not None:
+            return cached
+
+        postings: dict[int, float] = {}
+        max_edits = _max_edits(token)
+        if max_edits:
+            grams = _trigrams(token)
+            shared = Counter(w for g in grams for w in self._grams.get(g, ()))
+            # One edit changes at most four padded trigrams.
+            min_shared = len(grams) - 4 * max_edits
+            for word, count in shared.items():
+                if count < min_shared:
+                    continue
+                distance = edit_distance(token, word, max_edits)
+                if distance > max_edits:
+                    continue
+                factor = FUZZY_FACTOR * (1 - distance / max(len(token), len(word)))
+                for i, weight in self._terms[word].items():
+                    if postings.get(i, 0.0) < weight * factor:
+                        postings[i] = weight * factor
+
+        if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[token] = postings
+        return postings
+
+    def _postings(self, token: str) -> dict[int, float]:
+        return self._terms.get(token) or self._fuzzy(token)
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[int, float]]:
+        """Return (item position, score) pairs, best first.
+
+        Every query token must match an item (as a whole token, a prefix
+        or, failing both, a near spelling); an exact item or product code
+        match ranks first.
+        """
+        scores: dict[int, float] = {}
+        for i in self._codes.get(query.strip().lower(), []):
+            scores[i] = CODE_SCORE
+
+        tokens = tokenize(query)
+        if tokens:
+            matched = dict(self._postings(tokens[0]))
+            for token in tokens[1:]:
+                postings = self._postings(token)
+                if not postings:
+                    matched = {}
+                    break
+                matched = {
+                    i: score + postings[i]
+                    for i, score in matched.items()
+                    if i in postings
+                }
+            for i, score in matched.items():
+                scores[i] = scores.get(i, 0.0) + score
+
+        return heapq.nsmallest(limit, scores.items(), key=lambda hit: (-hit[1], hit[0]))
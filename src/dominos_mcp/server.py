@@ -1,49 +1,142 @@
+import asyncio
+import functools
 import json
 import logging
 import os
 import sys
+import time
 from contextlib import asynccontextmanager
 from typing import Any, Optional
 
 from mcp.server.fastmcp import FastMCP, Context
+from starlette.requests import Request
+from starlette.responses import Response
 
+from dominos_mcp import client, menu_store, metrics, upstream
+from dominos_mcp.audit import AUDIT_LOG
 from dominos_mcp.config import DominosConfig, load_config
-from dominos_mcp.state import ServerState
+from dominos_mcp.order_cache import CHECKED_ORDERS
+from dominos_mcp.profiling import PROFILER, ProfilerBusy
+from dominos_mcp.state import MENU_CACHE, ServerState, SessionConflict, SessionStore
+from dominos_mcp.store_lookup import STORE_LOOKUPS
 from dominos_mcp.tools.cart import add_to_cart, clear_cart, get_cart, remove_from_cart
-from dominos_mcp.tools.order import place_order, price_order, validate_order
-from dominos_mcp.tools.store import find_nearby_stores, get_menu, search_menu_items
+from dominos_mcp.tools.history import get_order_history, reorder
+from dominos_mcp.tools.order import (
+    order_template,
+    place_order,
+    price_order,
+    validate_order,
+)
+from dominos_mcp.tools.store import (
+    find_nearby_stores,
+    get_menu,
+    prewarm_store_lookup,
+    search_menu_items,
+)
+from dominos_mcp.tracing import TRACER, TraceIdFilter, span
 
-# Configure logging
+# Configure logging; records logged during a traced call carry its trace ID
 log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+_log_handler = logging.StreamHandler(sys.stderr)
+_log_handler.addFilter(TraceIdFilter())
 logging.basicConfig(
     level=getattr(logging, log_level, logging.INFO),
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    stream=sys.stderr,
+    format="%(asctime)s [%(levelname)s] [%(trace_id)s] %(name)s: %(message)s",
+    handlers=[_log_handler],
 )
 logger = logging.getLogger(__name__)
 
 
-@asynccontextmanager
-async def lifespan(server: FastMCP):
-    """Initialize server state and config on startup."""
-    logger.info("Starting Domino's MCP server...")
+# Lifespan runs per MCP session; carts must outlive it, so they live here.
+sessions = SessionStore()
 
-    try:
-        config = load_config()
+# PROFILE_CALLS=N profiles the first N tool calls of each worker.
+PROFILER.arm_from_env()
+
+# Set by `_load` the first time the config is read and applied
+_config: Optional[DominosConfig] = None
+
+
+def _configure(config: DominosConfig) -> None:
+    """Apply the config to the process-wide services; called once, by `_load`."""
+    upstream.configure(
+        config.server.upstream_workers, config.server.upstream_timeout_seconds
+    )
+    client.configure(
+        config.server.upstream_timeout_seconds, config.server.dominos_api_url
+    )
+    menu_store.configure(config.cache.persist_menus)
+    MENU_CACHE.configure(config.cache.menu_ttl_seconds, config.cache.menu_max_stores)
+    STORE_LOOKUPS.configure(
+        config.cache.store_identity_ttl_seconds,
+        config.cache.store_status_ttl_seconds,
+        config.cache.store_lookup_max_addresses,
+        config.cache.persist_store_lookups,
+    )
+    order_template(config)
+    AUDIT_LOG.configure(
+        config.audit.max_bytes, config.audit.rotate_seconds, config.audit.backup_count
+    )
+    CHECKED_ORDERS.configure(
+        config.cache.order_validation_ttl_seconds, CHECKED_ORDERS.max_entries
+    )
+    TRACER.configure(
+        config.tracing.enabled,
+        config.tracing.exporter,
+        config.tracing.path,
+        config.tracing.otlp_endpoint,
+        config.tracing.sample_rate,
+        config.tracing.slow_threshold_ms,
+        config.audit.max_bytes,
+        config.audit.backup_count,
+    )
+    sessions.configure(
+        config.server.per_session_state,
+        config.server.session_idle_seconds,
+        # Other workers read the database on every request: write through.
+        0 if workers > 1 else config.server.state_save_debounce_seconds,
+    )
+
+
+def _load() -> DominosConfig:
+    """Load the config and apply it to the process-wide services, once."""
+    global _config
+    if _config is None:
+        try:
+            config = load_config()
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            raise
+        _configure(config)
+        _config = config
         logger.info("Config loaded successfully")
-    except FileNotFoundError as e:
-        logger.error(str(e))
-        raise
+    return _config
+
 
-    state = ServerState()
+async def _startup(config: DominosConfig) -> None:
+    """Process-wide warm-up, run once per worker when the app starts."""
+    if config.cache.prewarm_store_lookup:
+        await prewarm_store_lookup(config)
 
-    yield {"config": config, "state": state}
 
-    logger.info("Shutting down Domino's MCP server")
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Hand each MCP session the process-wide config and session store.
+
+    This runs per MCP session, and per request when the transport is
+    stateless, so it only loads the config if the app's startup has not
+    (as when FastMCP is run directly, e.g. over stdio).
+    """
+    config = _load()
+    try:
+        yield {"config": config, "sessions": sessions}
+    finally:
+        await sessions.flush()
 
 
 host = os.environ.get("HOST", "0.0.0.0")
 port = int(os.environ.get("PORT", "8000"))
+workers = int(os.environ.get("WORKERS", "1"))
 
 mcp = FastMCP(
     "Domino's Pizza MCP Server",
@@ -53,17 +146,107 @@ mcp = FastMCP(
 )
 
 
-def _get_deps(ctx) -> tuple[ServerState, DominosConfig]:
-    """Extract state and config from the MCP context."""
-    state = ctx.request_context.lifespan_context["state"]
+metrics.Gauge(
+    "dominos_mcp_sessions",
+    "Sessions held in memory: carts of MCP sessions active within session_idle_seconds.",
+    collect=lambda: {(): len(sessions)},
+)
+metrics.Gauge(
+    "dominos_mcp_cache_entries",
+    "Entries held per cache.",
+    ["cache"],
+    collect=lambda: {
+        ("menu",): len(MENU_CACHE),
+        ("store_lookup",): len(STORE_LOOKUPS.identity),
+        ("order_validation",): len(CHECKED_ORDERS),
+    },
+)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape target; values are per worker process."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def tool(fn):
+    """Register `fn` as an MCP tool, recording its latency and outcome.
+
+    Each call is also the root span of a trace when tracing is enabled,
+    and is profiled while the profiler is armed. When session writes go
+    through (several workers), the response waits for them.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def timed(*args, **kwargs):
+        ctx = kwargs["ctx"]
+        metrics.TOOLS_IN_FLIGHT.inc()
+        outcome = "exception"
+        start = time.perf_counter()
+        try:
+            with TRACER.trace(
+                name,
+                _header(ctx, "traceparent"),
+                session=_session_id(ctx),
+                mcp_request_id=str(ctx.request_id),
+            ) as root, PROFILER.call(name):
+                result = await fn(*args, **kwargs)
+                try:
+                    await sessions.sync(_session_id(ctx))
+                except SessionConflict as e:
+                    result = _dumps(
+                        {"success": False, "error": str(e), "code": "SESSION_CONFLICT"}
+                    )
+                # Every tool returns json.dumps of a dict that starts with "success"
+                outcome = "error" if result.startswith('{"success": false') else "ok"
+                root.set(outcome=outcome)
+            return result
+        finally:
+            metrics.TOOL_DURATION.observe(time.perf_counter() - start, name)
+            metrics.TOOL_CALLS.inc(name, outcome)
+            metrics.TOOLS_IN_FLIGHT.dec()
+
+    return mcp.tool()(timed)
+
+
+def _header(ctx, name: str) -> Optional[str]:
+    """An HTTP header of the current request, if any (None on stdio)."""
+    request = ctx.request_context.request
+    return request.headers.get(name) if request is not None else None
+
+
+def _session_id(ctx) -> Optional[str]:
+    """Session key of the current HTTP request, if any (None on stdio).
+
+    A client-chosen X-Session-Id wins: it stays the same across
+    connections and restarts, so carts and order history follow the
+    client. Without it the key is the MCP session ID, which is new for
+    every connection (and absent with the stateless transport).
+    """
+    return _header(ctx, "x-session-id") or _header(ctx, "mcp-session-id")
+
+
+async def _get_deps(ctx) -> tuple[ServerState, DominosConfig]:
+    """Extract the session's state and config from the MCP context."""
+    with span("session.load"):
+        state = await ctx.request_context.lifespan_context["sessions"].get(
+            _session_id(ctx)
+        )
     config = ctx.request_context.lifespan_context["config"]
     return state, config
 
 
+def _dumps(result: dict[str, Any]) -> str:
+    """Serialize a tool result for the MCP response."""
+    with span("serialize"):
+        return json.dumps(result)
+
+
 # --- Store Tools ---
 
 
-@mcp.tool()
+@tool
 async def tool_find_nearby_stores(
     ctx: Context,
     street: str = "",
@@ -75,14 +258,14 @@ async def tool_find_nearby_stores(
     """Find Domino's stores near a given address. Returns stores sorted by distance.
     Should be called first to select a store before browsing menu or building an order.
     All address fields are optional — omit to use your default address from config."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await find_nearby_stores(
         state, config, street, city, region, postal_code, order_type
     )
-    return json.dumps(result)
+    return _dumps(result)
 
 
-@mcp.tool()
+@tool
 async def tool_get_menu(
     ctx: Context,
     store_id: str = "",
@@ -90,12 +273,12 @@ async def tool_get_menu(
 ) -> str:
     """Get the full menu for the currently selected store (or a specified store).
     Returns categorized menu items. Categories: Pizza, Wings, Pasta, Bread, Drinks, Desserts, Coupons, All."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await get_menu(state, config, store_id, category)
-    return json.dumps(result)
+    return _dumps(result)
 
 
-@mcp.tool()
+@tool
 async def tool_search_menu_items(
     ctx: Context,
     query: str,
@@ -103,24 +286,25 @@ async def tool_search_menu_items(
 ) -> str:
     """Search for specific items in the store menu by name or description.
     More focused than get_menu — use this when the user asks for something specific
-    like 'pepperoni pizza' or 'buffalo wings'."""
-    state, config = _get_deps(ctx)
+    like 'pepperoni pizza' or 'buffalo wings'. Tolerates typos (e.g. 'peperoni');
+    results are ranked best first with a relevance score."""
+    state, config = await _get_deps(ctx)
     result = await search_menu_items(state, config, query, store_id)
-    return json.dumps(result)
+    return _dumps(result)
 
 
 # --- Cart Tools ---
 
 
-@mcp.tool()
+@tool
 async def tool_get_cart(ctx: Context) -> str:
     """View the current cart contents and running total."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await get_cart(state, config)
-    return json.dumps(result)
+    return _dumps(result)
 
 
-@mcp.tool()
+@tool
 async def tool_add_to_cart(
     ctx: Context,
     item_code: str,
@@ -131,51 +315,51 @@ async def tool_add_to_cart(
     """Add an item to the current order. Use search_menu_items to find valid item codes first.
     Options format for toppings: {"P": {"1/1": "1"}} adds pepperoni full coverage.
     Quantity must be 1-10."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await add_to_cart(
         state, config, item_code, quantity, options, special_instructions
     )
-    return json.dumps(result)
+    return _dumps(result)
 
 
-@mcp.tool()
+@tool
 async def tool_remove_from_cart(ctx: Context, cart_index: int) -> str:
     """Remove an item from the cart by its cart index (from get_cart response)."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await remove_from_cart(state, config, cart_index)
-    return json.dumps(result)
+    return _dumps(result)
 
 
-@mcp.tool()
+@tool
 async def tool_clear_cart(ctx: Context) -> str:
     """Empty the entire cart. Also clears the selected store."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await clear_cart(state, config)
-    return json.dumps(result)
+    return _dumps(result)
 
 
 # --- Order Tools ---
 
 
-@mcp.tool()
+@tool
 async def tool_price_order(ctx: Context) -> str:
     """Get the full pricing breakdown for the current cart including taxes and fees.
     Does NOT place the order. Use this before place_order to show the user what they'll pay."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await price_order(state, config)
-    return json.dumps(result)
+    return _dumps(result)
 
 
-@mcp.tool()
+@tool
 async def tool_validate_order(ctx: Context) -> str:
     """Validate the current order without placing it. Checks item availability,
     delivery address, minimum order amount. Returns any validation errors."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await validate_order(state, config)
-    return json.dumps(result)
+    return _dumps(result)
 
 
-@mcp.tool()
+@tool
 async def tool_place_order(
     ctx: Context,
     confirm_order: str,
@@ -188,12 +372,131 @@ async def tool_place_order(
     tip_amount is in CAD (e.g. 3.00). Default: 0.
     scheduled_time is optional ISO 8601 format (e.g. '2026-02-27T18:30:00') for future delivery.
     Must be at least 30 minutes in the future. If omitted, order is placed for ASAP delivery."""
-    state, config = _get_deps(ctx)
+    state, config = await _get_deps(ctx)
     result = await place_order(state, config, confirm_order, tip_amount, scheduled_time)
-    return json.dumps(result)
+    return _dumps(result)
+
 
+# --- Order History Tools ---
+
+
+@tool
+async def tool_get_order_history(
+    ctx: Context,
+    limit: int = 10,
+    cursor: int = 0,
+    store_id: str = "",
+    status: str = "",
+    since: str = "",
+    until: str = "",
+) -> str:
+    """List this client's past orders, newest first, with their items, store, status
+    and total. Filter by store_id, status (CONFIRMED, DRY_RUN, FAILED) and an ISO 8601
+    date range in UTC unless an offset is given (since inclusive, until exclusive,
+    e.g. since='2026-02-27', until='2026-02-28'). placed_at is in UTC too.
+    Returns up to limit (max 50) orders; pass next_cursor back as cursor for older ones."""
+    state, config = await _get_deps(ctx)
+    result = await get_order_history(
+        state, config, limit, cursor, store_id, status, since, until
+    )
+    return _dumps(result)
+
+
+@tool
+async def tool_reorder(ctx: Context, order_number: int) -> str:
+    """Replace the cart with the items of one of this client's past orders (order_number
+    from get_order_history) and select that order's store. Does NOT place the order —
+    call price_order and place_order afterwards as usual."""
+    state, config = await _get_deps(ctx)
+    result = await reorder(state, config, order_number)
+    return _dumps(result)
+
+
+# --- Admin Tools ---
+
+if os.environ.get("ADMIN_TOOLS", "false").lower() in ("true", "1", "yes"):
+
+    @tool
+    async def tool_profile_tool_calls(
+        ctx: Context,
+        calls: int = 20,
+        mode: str = "sample",
+        tool_name: str = "",
+        interval_ms: float = 5.0,
+    ) -> str:
+        """ADMIN: profile the next `calls` tool calls on this server process (only
+        `tool_name`'s, e.g. 'tool_search_menu_items', if given). mode 'sample' writes
+        collapsed stacks for flame graphs (sampled every interval_ms); 'cprofile' writes
+        a pstats file. The file is written to the profile directory after the last call."""
+        try:
+            output = PROFILER.arm(calls, mode, tool_name, interval_ms)
+        except ProfilerBusy as e:
+            return _dumps(
+                {
+                    "success": False,
+                    "error": str(e),
+                    "code": "PROFILER_BUSY",
+                    "remaining": PROFILER.remaining,
+                    "output": PROFILER.output,
+                }
+            )
+        except ValueError as e:
+            return _dumps({"success": False, "error": str(e), "code": "INVALID_ARGUMENT"})
+        return _dumps(
+            {"success": True, "calls": calls, "mode": mode, "tool": tool_name or None, "output": output}
+        )
+
+
+def create_app():
+    """App factory: the /mcp endpoint plus process-wide startup and shutdown.
+
+    FastMCP's lifespan runs per MCP session, so one-off work (loading and
+    applying the config, pre-warming caches, the final state flush) hangs
+    off the ASGI app's lifespan instead. With several workers, MCP sessions would live in one
+    worker's memory, so the transport runs stateless and every request
+    can land on any worker; carts, sessions and menus come from the
+    shared SQLite database.
+    """
+    mcp.settings.stateless_http = workers > 1
+    app = mcp.streamable_http_app()
+    session_manager_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def app_lifespan(app):
+        logger.info("Starting Domino's MCP server...")
+        try:
+            config = _load()
+        except FileNotFoundError:
+            config = None  # reported again to each session until it exists
+        async with session_manager_lifespan(app):
+            warmup = asyncio.create_task(_startup(config)) if config else None
+            try:
+                yield
+            finally:
+                if warmup is not None:
+                    warmup.cancel()
+                logger.info("Shutting down Domino's MCP server")
+                await sessions.flush()
+                AUDIT_LOG.close()
+                TRACER.close()
+
+    app.router.lifespan_context = app_lifespan
+    return app
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     logger.info(f"Starting MCP server on {host}:{port}")
-    mcp.run(transport="streamable-http")
+    if workers > 1:
+        logger.info(f"Running {workers} workers with shared state")
+        uvicorn.run(
+            "dominos_mcp.server:create_app",
+            factory=True,
+            host=host,
+            port=port,
+            workers=workers,
+            log_level=log_level.lower(),
+        )
+    else:
+        uvicorn.run(create_app(), host=host, port=port, log_level=log_level.lower())
@@ -1,8 +1,21 @@
+import asyncio
+import atexit
 import json
+import logging
 import os
+import time
 from dataclasses import dataclass, field, asdict
 from typing import Any, Optional
 
+from dominos_mcp.cache import TTLCache
+from dominos_mcp.search import MenuIndex
+from dominos_mcp.storage import get_storage
+from dominos_mcp.tracing import span
+from dominos_mcp.upstream import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Pre-SQLite JSON state file; imported once into the state database if present.
 STATE_PATH = os.environ.get("DOMINOS_STATE_PATH", "/tmp/dominos_cart_state.json")
 
 
@@ -14,33 +27,306 @@ class CartItem:
     special_instructions: str = ""
 
 
+@dataclass
+class MenuEntry:
+    """A store menu parsed once and kept ready for get_menu, search and orders."""
+
+    categories: dict[str, list[dict]]
+    search_items: list[dict]
+    # Raw menu variants by code, copied into order payloads as products
+    variants: dict[str, dict] = field(default_factory=dict)
+    # Derived from search_items on construction; never persisted
+    index: MenuIndex = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.index = MenuIndex(self.search_items)
+
+
+# FastMCP runs the lifespan once per MCP session, so anything that must
+# outlive a session (menus, carts) lives in module-level objects.
+# Defaults here are replaced from the config's cache section at startup.
+MENU_CACHE: TTLCache[MenuEntry] = TTLCache(ttl=900.0, max_entries=32, name="menu")
+
+DEFAULT_SESSION = "default"
+
+
 @dataclass
 class ServerState:
     cart: list[CartItem] = field(default_factory=list)
     store_id: Optional[str] = None
     store_info: dict[str, Any] = field(default_factory=dict)
-    menu_cache: dict[str, Any] = field(default_factory=dict)
+    menu_cache: TTLCache[MenuEntry] = field(default_factory=lambda: MENU_CACHE)
+    session_id: str = DEFAULT_SESSION
+    last_active: float = field(default_factory=time.time)
+    # Version of the stored row this state matches; -1 before the first load
+    version: int = -1
+    _sessions: Optional["SessionStore"] = field(default=None, repr=False, compare=False)
 
-    def __post_init__(self):
-        self._load()
+    def save(self):
+        """Schedule persisting this session."""
+        if self._sessions is not None:
+            self._sessions.save(self)
+
+
+class SessionConflict(Exception):
+    """Raised when another request changed a session before this one's write."""
+
+
+class SessionStore:
+    """One ServerState per MCP session, backed by the SQLite state database.
+
+    With per-session state off, every request maps to DEFAULT_SESSION and
+    shares one cart, as before. There is one ServerState object per session
+    for the life of the process: each `get` asks the database for the row
+    only if its version is newer than the object's (an indexed point
+    lookup, off the event loop) and, unless the session has unsaved local
+    changes, copies it into that same object. Handlers still holding the
+    object therefore never save an outdated copy over a newer one, and
+    several worker processes see each other's updates. Sessions idle for
+    longer than `idle_seconds` are deleted.
+
+    Writes are write-behind: `save` marks the session dirty and a burst of
+    saves within `debounce_seconds` becomes one transaction. A debounce of
+    0 writes through, which multi-worker mode relies on: the write starts
+    at once, still off the event loop, and `sync` lets the caller wait for
+    it before responding. Call `flush` on shutdown; an atexit hook covers
+    anything still pending.
+
+    A write only replaces the row version the session was loaded from.
+    If another process wrote the session in between, the local change is
+    dropped, the session is reloaded, and `sync` raises SessionConflict so
+    the tool call fails instead of silently overwriting the other write.
+    """
+
+    SWEEP_INTERVAL = 60.0
 
-    def _load(self):
+    def __init__(self, legacy_path: str = STATE_PATH):
+        self.legacy_path = legacy_path
+        self.per_session = False
+        self.idle_seconds = 3600.0
+        self.debounce_seconds = 0.5
+        self._states: dict[str, ServerState] = {}
+        self._migrated = False
+        self._last_sweep = 0.0
+        # session key -> change counter, so a flush only clears what it wrote
+        self._dirty: dict[str, int] = {}
+        self._changes = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        # Keys whose last write lost to another process's, until `sync` reports it
+        self._conflicts: set[str] = set()
+        atexit.register(self._flush_sync)
+
+    def configure(
+        self, per_session: bool, idle_seconds: float, debounce_seconds: float
+    ) -> None:
+        self.per_session = per_session
+        self.idle_seconds = idle_seconds
+        self.debounce_seconds = debounce_seconds
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def key(self, session_id: Optional[str]) -> str:
+        """The session key a request's session ID maps to."""
+        return session_id if self.per_session and session_id else DEFAULT_SESSION
+
+    async def get(self, session_id: Optional[str]) -> ServerState:
+        """Return the state for an MCP session, creating it on first use."""
+        if not self._migrated:
+            async with self._write_lock:
+                if not self._migrated:
+                    await run_blocking(self._import_legacy_file)
+        key = self.key(session_id)
+        await self._evict_idle()
+
+        state = self._states.get(key)
+        if state is None:
+            state = ServerState(session_id=key, last_active=0.0, _sessions=self)
+            self._states[key] = state
+        if key not in self._dirty:
+            row = await run_blocking(get_storage().load_session, key, state.version)
+            # Local changes made while the row was read take precedence
+            if row is not None and key not in self._dirty and row["version"] > state.version:
+                self._apply(state, row)
+
+        # Keep last_active coarse so read-only calls rarely cost a write.
+        now = time.time()
+        if now - state.last_active > self.SWEEP_INTERVAL:
+            state.last_active = now
+            self.save(state)
+        return state
+
+    @staticmethod
+    def _apply(state: ServerState, row: dict[str, Any]) -> None:
+        """Copy a stored row into the session's object, in place."""
+        state.cart = [CartItem(**c) for c in row["cart"]]
+        state.store_id = row["store_id"]
+        state.store_info = row["store_info"]
+        state.last_active = row["last_active"]
+        state.version = row["version"]
+
+    async def _evict_idle(self) -> None:
+        now = time.time()
+        if now - self._last_sweep < self.SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        cutoff = now - self.idle_seconds
+        for key in [
+            key
+            for key, state in self._states.items()
+            if key not in self._dirty and state.last_active < cutoff
+        ]:
+            self._states.pop(key, None)
         try:
-            if os.path.exists(STATE_PATH):
-                with open(STATE_PATH) as f:
-                    data = json.load(f)
-                self.store_id = data.get("store_id")
-                self.cart = [CartItem(**item) for item in data.get("cart", [])]
-        except Exception:
-            pass
+            evicted = await run_blocking(
+                get_storage().delete_idle_sessions, cutoff, keep=DEFAULT_SESSION
+            )
+            if evicted:
+                logger.info(f"Evicted {evicted} idle session(s)")
+        except Exception as e:
+            logger.warning(f"Failed to evict idle sessions: {e}")
 
-    def save(self):
+    def _import_legacy_file(self) -> None:
+        """Carry over carts from the JSON state file used before SQLite."""
+        self._migrated = True
         try:
-            data = {
-                "store_id": self.store_id,
-                "cart": [asdict(item) for item in self.cart],
+            storage = get_storage()
+            if not os.path.exists(self.legacy_path) or storage.has_sessions():
+                return
+            with open(self.legacy_path) as f:
+                data = json.load(f)
+            sessions = data.get("sessions", {DEFAULT_SESSION: data})
+            now = time.time()
+            storage.save_sessions(
+                {
+                    key: {
+                        "store_id": item.get("store_id"),
+                        "store_info": {},
+                        "cart": item.get("cart", []),
+                        "last_active": item.get("last_active", now),
+                    }
+                    for key, item in sessions.items()
+                }
+            )
+            logger.info(f"Imported {len(sessions)} session(s) from {self.legacy_path}")
+        except Exception as e:
+            logger.warning(f"Could not import legacy state file {self.legacy_path}: {e}")
+
+    def _snapshot(self) -> tuple[dict[str, dict[str, Any]], dict[str, int]]:
+        rows = {}
+        for key in self._dirty:
+            state = self._states.get(key)
+            if state is None:
+                continue
+            rows[key] = {
+                "store_id": state.store_id,
+                "store_info": state.store_info,
+                "cart": [asdict(item) for item in state.cart],
+                "last_active": state.last_active,
+                "version": state.version,
             }
-            with open(STATE_PATH, "w") as f:
-                json.dump(data, f)
-        except Exception:
-            pass
+        return rows, dict(self._dirty)
+
+    def _clear_written(
+        self, written: dict[str, int], versions: dict[str, Optional[int]]
+    ) -> list[str]:
+        """Record the new versions; returns the keys whose write conflicted."""
+        conflicts = []
+        for key, change in written.items():
+            if key not in versions:
+                continue
+            if versions[key] is None:
+                conflicts.append(key)
+                # The local change is dropped either way; reload before retrying
+                self._dirty.pop(key, None)
+                continue
+            state = self._states.get(key)
+            if state is not None:
+                state.version = versions[key]
+            if self._dirty.get(key) == change:
+                del self._dirty[key]
+        return conflicts
+
+    def save(self, state: ServerState) -> None:
+        """Mark a session dirty and schedule a debounced write."""
+        self._changes += 1
+        self._dirty[state.session_id] = self._changes
+        self._states[state.session_id] = state
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            self._flush_sync()
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                max(self.debounce_seconds, 0.0), self._start_flush
+            )
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def sync(self, session_id: Optional[str]) -> None:
+        """When writing through, wait until this request's changes are stored.
+
+        Raises SessionConflict if another request changed the session first.
+        """
+        if self.debounce_seconds > 0:
+            return
+        key = self.key(session_id)
+        if key in self._dirty:
+            with span("session.save"):
+                await self.flush()
+        if key in self._conflicts:
+            self._conflicts.discard(key)
+            raise SessionConflict(
+                "The session was changed by another request at the same time, so"
+                " this call's cart and store changes were not saved. The session"
+                " has been reloaded; check it and retry."
+            )
+
+    async def flush(self) -> None:
+        """Write pending changes now, off the event loop."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        async with self._write_lock:
+            if not self._dirty:
+                return
+            rows, written = self._snapshot()
+            try:
+                versions = await run_blocking(get_storage().save_sessions, rows)
+                conflicts = self._clear_written(written, versions)
+            except Exception as e:
+                logger.warning(f"Failed to save session state: {e}")
+                return
+            for key in conflicts:
+                await self._reload(key)
+
+    async def _reload(self, key: str) -> None:
+        """Replace a session's lost local change with the stored row."""
+        logger.warning(f"Session {key} was changed elsewhere; dropped a local change")
+        if self.debounce_seconds <= 0:
+            self._conflicts.add(key)
+        state = self._states.get(key)
+        try:
+            row = await run_blocking(get_storage().load_session, key)
+        except Exception as e:
+            logger.warning(f"Failed to reload session {key}: {e}")
+            return
+        if state is not None and row is not None and key not in self._dirty:
+            self._apply(state, row)
+
+    def _flush_sync(self) -> None:
+        if not self._dirty:
+            return
+        rows, written = self._snapshot()
+        try:
+            for key in self._clear_written(written, get_storage().save_sessions(rows)):
+                logger.warning(f"Session {key} was changed elsewhere; dropped a local change")
+        except Exception as e:
+            logger.warning(f"Failed to save session state: {e}")
@@ -0,0 +1,381 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.environ.get("DOMINOS_DB_PATH", "/tmp/dominos_state.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id  TEXT PRIMARY KEY,
+    store_id    TEXT,
+    store_info  TEXT NOT NULL DEFAULT '{}',
+    cart        TEXT NOT NULL DEFAULT '[]',
+    last_active REAL NOT NULL,
+    version     INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_last_active ON sessions (last_active);
+
+CREATE TABLE IF NOT EXISTS menus (
+    store_id  TEXT PRIMARY KEY,
+    format    INTEGER NOT NULL,
+    version   TEXT NOT NULL,
+    payload   BLOB NOT NULL,
+    stored_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS store_lookups (
+    lookup_key        TEXT PRIMARY KEY,
+    stores            TEXT NOT NULL,
+    fetched_at        REAL NOT NULL,
+    status            TEXT NOT NULL DEFAULT '{}',
+    status_fetched_at REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at    REAL NOT NULL,
+    session_id    TEXT NOT NULL,
+    store_id      TEXT,
+    status        TEXT NOT NULL,
+    order_id      TEXT,
+    total         REAL,
+    scheduled_for TEXT,
+    items         TEXT NOT NULL,
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_created_at ON orders (created_at);
+CREATE INDEX IF NOT EXISTS orders_store ON orders (store_id, id);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status, id);
+CREATE INDEX IF NOT EXISTS orders_session ON orders (session_id, id);
+"""
+
+ORDER_COLUMNS = (
+    "id",
+    "created_at",
+    "session_id",
+    "store_id",
+    "status",
+    "order_id",
+    "total",
+    "scheduled_for",
+    "items",
+    "error",
+)
+
+
+class Storage:
+    """Embedded SQLite store for sessions, menus, store lookups and order history.
+
+    The database runs in WAL mode, so readers never block on a writer and
+    several worker processes can share one file. Each thread gets its own
+    connection (callers reach it through the upstream pool, off the event
+    loop). Writes are short IMMEDIATE transactions that wait
+    up to `busy_timeout` for another process's write lock.
+    """
+
+    def __init__(self, path: str = DB_PATH, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._migrate(conn)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Bring databases created by older versions up to the current schema."""
+        for table, column, definition in (
+            ("sessions", "version", "INTEGER NOT NULL DEFAULT 0"),
+            ("store_lookups", "status", "TEXT NOT NULL DEFAULT '{}'"),
+            ("store_lookups", "status_fetched_at", "REAL NOT NULL DEFAULT 0"),
+        ):
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    # --- Sessions ---
+
+    def load_session(
+        self, session_id: str, newer_than: int = -1
+    ) -> Optional[dict[str, Any]]:
+        """The session's row, or None if missing or not newer than version `newer_than`."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT store_id, store_info, cart, last_active, version FROM sessions"
+                " WHERE session_id = ? AND version > ?",
+                (session_id, newer_than),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return {
+            "store_id": row[0],
+            "store_info": json.loads(row[1]),
+            "cart": json.loads(row[2]),
+            "last_active": row[3],
+            "version": row[4],
+        }
+
+    def has_sessions(self) -> bool:
+        return self._conn().execute("SELECT 1 FROM sessions LIMIT 1").fetchone() is not None
+
+    def save_sessions(
+        self, sessions: dict[str, dict[str, Any]]
+    ) -> dict[str, Optional[int]]:
+        """Write several sessions in one transaction; returns their new versions.
+
+        Each write is a compare-and-swap: it only replaces a row still at
+        the session's `version` (the one its copy was loaded from, -1 for a
+        session never stored) and bumps it. A session whose row has moved
+        on since, or was created meanwhile, is left alone and maps to None.
+        """
+        conn = self._conn()
+        versions: dict[str, Optional[int]] = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, s in sessions.items():
+                values = (
+                    s["store_id"],
+                    json.dumps(s["store_info"]),
+                    json.dumps(s["cart"]),
+                    s["last_active"],
+                )
+                row = conn.execute(
+                    "UPDATE sessions SET store_id = ?, store_info = ?, cart = ?,"
+                    " last_active = ?, version = version + 1"
+                    " WHERE session_id = ? AND version = ? RETURNING version",
+                    (*values, key, s.get("version", -1)),
+                ).fetchone()
+                if row is None:
+                    # New, or deleted as idle meanwhile; a row that exists conflicts
+                    row = conn.execute(
+                        "INSERT INTO sessions"
+                        " (store_id, store_info, cart, last_active, session_id, version)"
+                        " VALUES (?, ?, ?, ?, ?, 1)"
+                        " ON CONFLICT (session_id) DO NOTHING RETURNING version",
+                        (*values, key),
+                    ).fetchone()
+                versions[key] = row[0] if row else None
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return versions
+
+    def delete_idle_sessions(self, cutoff: float, keep: str) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM sessions WHERE last_active < ? AND session_id != ?",
+            (cutoff, keep),
+        )
+        return cur.rowcount
+
+    # --- Menus ---
+
+    def load_menu(self, store_id: str) -> Optional[tuple[int, bytes, float]]:
+        """Return (format, payload, stored_at) for a store's persisted menu."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT format, payload, stored_at FROM menus WHERE store_id = ?",
+                (store_id,),
+            )
+            .fetchone()
+        )
+        return (row[0], row[1], row[2]) if row else None
+
+    def save_menu(
+        self, store_id: str, fmt: int, version: str, payload: bytes, stored_at: float
+    ) -> None:
+        self._conn().execute(
+            "INSERT INTO menus (store_id, format, version, payload, stored_at)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (store_id) DO UPDATE SET format = excluded.format,"
+            " version = excluded.version, payload = excluded.payload,"
+            " stored_at = excluded.stored_at",
+            (store_id, fmt, version, payload, stored_at),
+        )
+
+    def menu_version(self, store_id: str) -> Optional[str]:
+        row = (
+            self._conn()
+            .execute("SELECT version FROM menus WHERE store_id = ?", (store_id,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def touch_menu(self, store_id: str, stored_at: float) -> None:
+        self._conn().execute(
+            "UPDATE menus SET stored_at = ? WHERE store_id = ?", (stored_at, store_id)
+        )
+
+    # --- Store lookups ---
+
+    def load_store_lookup(
+        self, lookup_key: str
+    ) -> Optional[tuple[list[dict], float, dict[str, dict], float]]:
+        """Return (stores, fetched_at, status, status_fetched_at) for a cached lookup."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT stores, fetched_at, status, status_fetched_at FROM store_lookups"
+                " WHERE lookup_key = ?",
+                (lookup_key,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], json.loads(row[2]), row[3]
+
+    def save_store_lookup(
+        self,
+        lookup_key: str,
+        stores: list[dict],
+        fetched_at: float,
+        status: dict[str, dict],
+        status_fetched_at: float,
+        cutoff: float,
+    ) -> None:
+        """Upsert one lookup and drop lookups fetched before `cutoff`."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO store_lookups"
+                " (lookup_key, stores, fetched_at, status, status_fetched_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (lookup_key) DO UPDATE SET stores = excluded.stores,"
+                " fetched_at = excluded.fetched_at, status = excluded.status,"
+                " status_fetched_at = excluded.status_fetched_at",
+                (
+                    lookup_key,
+                    json.dumps(stores),
+                    fetched_at,
+                    json.dumps(status),
+                    status_fetched_at,
+                ),
+            )
+            conn.execute("DELETE FROM store_lookups WHERE fetched_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def save_store_status(
+        self, lookup_key: str, status: dict[str, dict], status_fetched_at: float
+    ) -> None:
+        """Replace the status of a stored lookup, leaving its stores as they are."""
+        self._conn().execute(
+            "UPDATE store_lookups SET status = ?, status_fetched_at = ?"
+            " WHERE lookup_key = ?",
+            (json.dumps(status), status_fetched_at, lookup_key),
+        )
+
+    # --- Order history (append-only) ---
+
+    def add_order(self, order: dict[str, Any]) -> int:
+        cur = self._conn().execute(
+            "INSERT INTO orders (created_at, session_id, store_id, status, order_id,"
+            " total, scheduled_for, items, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                order["created_at"],
+                order["session_id"],
+                order["store_id"],
+                order["status"],
+                order.get("order_id"),
+                order.get("total"),
+                order.get("scheduled_for"),
+                json.dumps(order["items"]),
+                order.get("error"),
+            ),
+        )
+        return cur.lastrowid
+
+    def list_orders(
+        self,
+        limit: int,
+        before_id: Optional[int] = None,
+        session_id: Optional[str] = None,
+        store_id: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+        """Newest first; page with `before_id` set to the last id seen."""
+        clauses, params = [], []
+        for clause, value in (
+            ("id < ?", before_id),
+            ("session_id = ?", session_id),
+            ("store_id = ?", store_id),
+            ("status = ?", status),
+            ("created_at >= ?", since),
+            ("created_at < ?", until),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders{where}"
+            " ORDER BY id DESC LIMIT ?",
+            (*params, limit),
+        )
+        return [self._order_row(row) for row in rows]
+
+    def get_order(
+        self, order_number: int, session_id: Optional[str] = None
+    ) -> Optional[dict[str, Any]]:
+        """One order by number; None if missing or, given `session_id`, another session's."""
+        row = (
+            self._conn()
+            .execute(
+                f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders"
+                " WHERE id = ? AND (? IS NULL OR session_id = ?)",
+                (order_number, session_id, session_id),
+            )
+            .fetchone()
+        )
+        return self._order_row(row) if row else None
+
+    @staticmethod
+    def _order_row(row: tuple) -> dict[str, Any]:
+        order = dict(zip(ORDER_COLUMNS, row))
+        order["items"] = json.loads(order["items"])
+        return order
+
+
+_storage: Optional[Storage] = None
+
+
+def get_storage() -> Storage:
+    """Return the process-wide storage, opening it on first use."""
+    global _storage
+    if _storage is None:
+        _storage = Storage()
+        logger.info(f"State database: {_storage.path}")
+    return _storage
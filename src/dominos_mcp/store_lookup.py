@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Optional
+
+from dominos_mcp import metrics
+from dominos_mcp.cache import TTLCache
+from dominos_mcp.client import get_client
+from dominos_mcp.storage import get_storage
+from dominos_mcp.upstream import SingleFlight, run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Store-locator fields that change during the day; everything else in a
+# store record (ID, address, phone, coordinates, minimums) is identity.
+STATUS_FIELDS = frozenset(
+    {
+        "IsOnlineNow",
+        "IsOpen",
+        "IsOnlineCapable",
+        "ServiceIsOpen",
+        "AllowDeliveryOrders",
+        "AllowCarryoutOrders",
+        "ServiceMethodEstimatedWaitMinutes",
+        "StoreAsOfTime",
+    }
+)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def lookup_key(line1: str, line2: str, service: str, country: str) -> str:
+    """Cache key for an address: case, punctuation and spacing are ignored."""
+
+    def norm(text: str) -> str:
+        return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+    return "|".join((country.lower(), service.lower(), norm(line1), norm(line2)))
+
+
+def _split(stores: list[dict]) -> tuple[list[dict], dict[str, dict]]:
+    identity = [{k: v for k, v in s.items() if k not in STATUS_FIELDS} for s in stores]
+    status = {
+        str(s.get("StoreID")): {k: v for k, v in s.items() if k in STATUS_FIELDS}
+        for s in stores
+    }
+    return identity, status
+
+
+def _merge(identity: list[dict], status: dict[str, dict]) -> list[dict]:
+    return [{**s, **status.get(str(s.get("StoreID")), {})} for s in identity]
+
+
+class StoreLookupCache:
+    """Nearby-store lookups keyed by normalized address, service and country.
+
+    A locator response is split in two: store identity and location stay
+    valid for `identity_ttl`, open/closed flags and wait times for
+    `status_ttl`. While both are fresh a lookup costs nothing. A stale
+    status is refreshed from the profiles of the cached stores, leaving
+    their identity and order alone; only a stale identity calls the
+    locator again. If the refresh fails, the last known stores are
+    returned flagged as stale instead of failing the tool.
+    Both parts are also kept in the state database with their fetch
+    times, so other workers and restarts start warm: they reuse a fresh
+    status, and fall back to the last known one as this process would.
+    """
+
+    def __init__(
+        self,
+        identity_ttl: float = 86400.0,
+        status_ttl: float = 60.0,
+        max_entries: int = 256,
+    ):
+        self.identity: TTLCache[list[dict]] = TTLCache(identity_ttl, max_entries)
+        self.status: TTLCache[dict[str, dict]] = TTLCache(status_ttl, max_entries)
+        self.persist = True
+        # Spellings of one address normalize to one key: share the fetch.
+        self._inflight = SingleFlight()
+
+    def configure(
+        self, identity_ttl: float, status_ttl: float, max_entries: int, persist: bool
+    ) -> None:
+        self.identity.configure(identity_ttl, max_entries)
+        self.status.configure(status_ttl, max_entries)
+        self.persist = persist
+
+    async def lookup(
+        self, line1: str, line2: str, service: str, country: str
+    ) -> tuple[list[dict[str, Any]], bool]:
+        """Return (stores nearest first, whether their status is stale)."""
+        key = lookup_key(line1, line2, service, country)
+        if key not in self.identity:
+            await self._load_persisted(key)
+
+        identity = self.identity.get(key) if self.identity.is_fresh(key) else None
+        if identity is not None and self.status.is_fresh(key):
+            metrics.CACHE_REQUESTS.inc("store_lookup", "hit")
+            return _merge(identity, self.status.get(key)), False
+
+        try:
+            if identity is None:
+                stores = await self._inflight.run(
+                    key, lambda: self._fetch(key, line1, line2, service, country)
+                )
+            else:
+                stores = await self._inflight.run(
+                    ("status", key),
+                    lambda: self._refresh_status(key, identity, country),
+                )
+        except Exception as e:
+            last_status = self.status.get(key)
+            if identity is None or last_status is None:
+                raise
+            logger.warning(f"Store lookup failed, serving last known stores: {e}")
+            metrics.CACHE_REQUESTS.inc("store_lookup", "stale")
+            return _merge(identity, last_status), True
+        metrics.CACHE_REQUESTS.inc("store_lookup", "miss")
+        return stores, False
+
+    async def _fetch(
+        self, key: str, line1: str, line2: str, service: str, country: str
+    ) -> list[dict[str, Any]]:
+        stores = await get_client().locate_stores(line1, line2, service, country)
+        identity, status = _split(stores)
+        self.identity.set(key, identity)
+        self.status.set(key, status)
+        if self.persist:
+            await self._persist(key, identity, status)
+        return stores
+
+    async def _refresh_status(
+        self, key: str, identity: list[dict], country: str
+    ) -> list[dict[str, Any]]:
+        client = get_client()
+        profiles = await asyncio.gather(
+            *(client.store_profile(str(s.get("StoreID")), country) for s in identity)
+        )
+        _, status = _split(profiles)
+        self.status.set(key, status)
+        if self.persist:
+            try:
+                await run_blocking(
+                    get_storage().save_store_status, key, status, time.time()
+                )
+            except Exception as e:
+                logger.warning(f"Failed to persist store status: {e}")
+        return _merge(identity, status)
+
+    async def _load_persisted(self, key: str) -> None:
+        if not self.persist:
+            return
+        try:
+            row = await run_blocking(get_storage().load_store_lookup, key)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable persisted store lookup: {e}")
+            return
+        if row is None:
+            return
+        identity, fetched_at, status, status_fetched_at = row
+        now = time.time()
+        age = max(0.0, now - fetched_at)
+        if age >= self.identity.ttl:
+            return
+        self.identity.set(key, identity, age=age)
+        if status:
+            # Restored even when stale: it is the fallback if the locator fails
+            self.status.set(key, status, age=max(0.0, now - status_fetched_at))
+
+    async def _persist(
+        self, key: str, identity: list[dict], status: dict[str, dict]
+    ) -> None:
+        now = time.time()
+        try:
+            await run_blocking(
+                get_storage().save_store_lookup,
+                key,
+                identity,
+                now,
+                status,
+                now,
+                now - self.identity.ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to persist store lookup: {e}")
+
+
+# Shared by every MCP session; replaced from the config's cache section at startup.
+STORE_LOOKUPS = StoreLookupCache()
+
+
+def is_available(store: dict[str, Any], service: str) -> bool:
+    """Whether a store is online and open for `service` (pizzapi's filter)."""
+    return bool(store.get("IsOnlineNow") and store.get("ServiceIsOpen", {}).get(service))
+
+
+async def prewarm(line1: str, line2: str, service: str, country: str) -> Optional[int]:
+    """Fill the cache for one address; returns the store count, or None on failure."""
+    try:
+        stores, _ = await STORE_LOOKUPS.lookup(line1, line2, service, country)
+        return len(stores)
+    except Exception as e:
+        logger.warning(f"Could not pre-warm store lookup: {e}")
+        return None
@@ -1,6 +1,7 @@
 import logging
 from typing import Any, Optional
 
+from dominos_mcp import order_cache
 from dominos_mcp.config import DominosConfig
 from dominos_mcp.state import CartItem, ServerState
 
@@ -64,6 +65,7 @@ async def add_to_cart(
             options=options or {},
             special_instructions=special_instructions,
         )
+        order_cache.invalidate(state, config)
         state.cart.append(cart_item)
         state.save()
 
@@ -99,7 +101,9 @@ async def remove_from_cart(
                 "code": "INVALID_INDEX",
             }
 
+        order_cache.invalidate(state, config)
         removed = state.cart.pop(cart_index)
+        state.save()
         return {
             "success": True,
             "removed_item": removed.code,
@@ -116,8 +120,9 @@ async def clear_cart(
     config: DominosConfig,
 ) -> dict[str, Any]:
     """Empty the entire cart and clear the selected store."""
+    order_cache.invalidate(state, config)
     state.cart.clear()
     state.store_id = None
-    state.save()
     state.store_info = {}
+    state.save()
     return {"success": True, "message": "Cart cleared."}
@@ -0,0 +1,100 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from dominos_mcp import order_cache, order_history
+from dominos_mcp.config import DominosConfig
+from dominos_mcp.state import CartItem, ServerState
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 50
+
+
+def _timestamp(value: str) -> Optional[float]:
+    """Parse an ISO 8601 date or datetime to a timestamp; UTC unless it has an offset."""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+async def get_order_history(
+    state: ServerState,
+    config: DominosConfig,
+    limit: int = 10,
+    cursor: int = 0,
+    store_id: str = "",
+    status: str = "",
+    since: str = "",
+    until: str = "",
+) -> dict[str, Any]:
+    """Page through the session's past orders, newest first."""
+    try:
+        try:
+            since_ts = _timestamp(since)
+            until_ts = _timestamp(until)
+        except ValueError:
+            return {
+                "success": False,
+                "error": "since/until must be ISO 8601 dates (e.g. 2026-02-27 or 2026-02-27T18:00:00).",
+                "code": "INVALID_TIME",
+            }
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        orders = await order_history.page(
+            state.session_id,
+            limit,
+            cursor or None,
+            store_id=store_id or None,
+            status=status.upper() or None,
+            since=since_ts,
+            until=until_ts,
+        )
+        return {
+            "success": True,
+            "orders": orders,
+            # Pass back as cursor for the next (older) page
+            "next_cursor": orders[-1]["order_number"] if len(orders) == limit else None,
+        }
+
+    except Exception as e:
+        logger.exception("Error reading order history")
+        return {"success": False, "error": str(e), "code": "HISTORY_FAILED"}
+
+
+async def reorder(
+    state: ServerState,
+    config: DominosConfig,
+    order_number: int,
+) -> dict[str, Any]:
+    """Replace the cart with the items of a past order and select its store."""
+    try:
+        order = await order_history.get(state.session_id, order_number)
+        if order is None:
+            return {
+                "success": False,
+                "error": f"No order {order_number} in the order history.",
+                "code": "ORDER_NOT_FOUND",
+            }
+
+        order_cache.invalidate(state, config)
+        state.cart = [CartItem(**item) for item in order["items"]]
+        if order["store_id"]:
+            state.store_id = order["store_id"]
+            state.store_info = {}
+        state.save()
+
+        return {
+            "success": True,
+            "store_id": state.store_id,
+            "items": order["items"],
+            "cart_total_items": len(state.cart),
+            "message": "Cart replaced with the past order. Call price_order to check current prices.",
+        }
+
+    except Exception as e:
+        logger.exception("Error reordering")
+        return {"success": False, "error": str(e), "code": "REORDER_FAILED"}
@@ -1,102 +1,307 @@
+import copy
 import json
 import logging
 import os
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
-import requests as _requests
-
 from pizzapi import Address as PizzaAddress
 from pizzapi import Customer as PizzaCustomer
 from pizzapi import Order as PizzaOrder
 from pizzapi import PaymentObject, Store
+from pizzapi.urls import Urls
 
+from dominos_mcp import metrics, order_cache, order_history
+from dominos_mcp.audit import AUDIT_LOG
+from dominos_mcp.client import get_client
 from dominos_mcp.config import DominosConfig
-from dominos_mcp.state import ServerState
+from dominos_mcp.state import CartItem, MenuEntry, ServerState
+from dominos_mcp.tools.store import get_menu_entry
+from dominos_mcp.tracing import span
+from dominos_mcp.upstream import SingleFlight
 
 logger = logging.getLogger(__name__)
 
-LOG_PATH = os.environ.get("LOG_PATH", "/data/orders.log")
 
+class _Order(PizzaOrder):
+    """pizzapi Order built around an already-fetched menu.
+
+    The stock constructor downloads the menu with an unpooled, blocking
+    requests.get; here products come from the store's cached MenuEntry
+    (or anything else with `variants`) and everything config-derived
+    comes from an OrderTemplate.
+    """
+
+    def __init__(
+        self, template: "OrderTemplate", store_id: Optional[str], menu: Optional[MenuEntry]
+    ):
+        self.store = Store(data={"StoreID": store_id}, country=template.country)
+        self.menu = menu
+        self.customer = template.customer
+        self.address = template.address
+        self.urls = template.urls
+        self.country = template.country
+        # Containers filled in per order are fresh; Address is shared with
+        # the template and only ever replaced, never mutated in place.
+        self.data = dict(
+            template.data,
+            Coupons=[],
+            Payments=[],
+            Products=[],
+            Tags={},
+            Partners={},
+            metaData={},
+            Amounts={},
+            AmountsBreakdown={},
+        )
 
-def _build_order(state: ServerState, config: DominosConfig) -> PizzaOrder:
-    """Build a pizzapi Order from current state and config."""
-    address = PizzaAddress(
-        config.address.street,
-        config.address.city,
-        config.address.region,
-        config.address.postal_code,
-        country=config.address.country,
-    )
+    def add_item(self, code: str, qty: int = 1, options: Optional[dict] = None) -> dict:
+        """Append one product line of `qty` units.
 
-    customer = PizzaCustomer(
-        config.customer.first_name,
-        config.customer.last_name,
-        config.customer.email,
-        config.customer.phone,
-    )
+        Unlike pizzapi's version this copies the menu variant instead of
+        mutating (and re-appending) the shared one, and sends the options.
+        """
+        item = dict(self.menu.variants[code])
+        item.update(
+            ID=len(self.data["Products"]) + 1, isNew=True, Qty=qty, AutoRemove=False
+        )
+        if options:
+            item["Options"] = options
+        self.data["Products"].append(item)
+        return item
+
+
+class OrderTemplate:
+    """The config-derived part of every order, built once.
+
+    Customer, address, URLs and the base payload (including the Canadian
+    market overrides) never change while the config does not, so each
+    order only copies the payload and adds the store and cart.
+    """
+
+    def __init__(self, config: DominosConfig):
+        self.customer_config = config.customer
+        self.address_config = config.address
+        self.country = config.address.country
+        self.address = PizzaAddress(
+            config.address.street,
+            config.address.city,
+            config.address.region,
+            config.address.postal_code,
+            country=self.country,
+        )
+        self.customer = PizzaCustomer(
+            config.customer.first_name,
+            config.customer.last_name,
+            config.customer.email,
+            config.customer.phone,
+        )
+        self.urls = Urls(self.country)
+        self.data = {
+            "Address": {
+                "Street": self.address.street,
+                "City": self.address.city,
+                "Region": self.address.region,
+                "PostalCode": self.address.zip,
+                "Type": "House",
+            },
+            "Coupons": [],
+            "CustomerID": "",
+            "Extension": "",
+            "OrderChannel": "OLO",
+            "OrderID": "",
+            "NoCombine": True,
+            "OrderMethod": "Web",
+            "OrderTaker": None,
+            "Payments": [],
+            "Products": [],
+            "Market": "",
+            "Currency": "",
+            "ServiceMethod": "Delivery",
+            "Tags": {},
+            "Version": "1.0",
+            "SourceOrganizationURI": "order.dominos.com",
+            "LanguageCode": "en",
+            "Partners": {},
+            "NewUser": True,
+            "metaData": {},
+            "Amounts": {},
+            "BusinessDate": "",
+            "EstimatedWaitMinutes": "",
+            "PriceOrderTime": "",
+            "AmountsBreakdown": {},
+            "Email": self.customer.email,
+            "FirstName": self.customer.first_name,
+            "LastName": self.customer.last_name,
+            "Phone": self.customer.phone,
+        }
+        # Fix hardcoded US values in pizzapi for Canadian orders
+        if self.country.lower() == "ca":
+            self.data["SourceOrganizationURI"] = "order.dominos.ca"
+            self.data["Market"] = "CANADA"
+
+    def matches(self, config: DominosConfig) -> bool:
+        return (
+            config.customer == self.customer_config
+            and config.address == self.address_config
+        )
 
-    store = Store(data={"StoreID": state.store_id}, country=config.address.country)
-    order = PizzaOrder(store, customer, address, country=config.address.country)
+    def new_order(self, store_id: Optional[str], menu: Optional[MenuEntry]) -> _Order:
+        """Empty order for a store."""
+        return _Order(self, store_id, menu)
 
-    # Fix hardcoded US values in pizzapi for Canadian orders
-    if config.address.country.lower() == "ca":
-        order.data["SourceOrganizationURI"] = "order.dominos.ca"
-        order.data["Market"] = "CANADA"
 
-        # Monkey-patch _send to use the Canadian Referer header
-        import types
+_template: Optional[OrderTemplate] = None
 
-        def _ca_send(self, url, merge):
-            self.data.update(
-                StoreID=self.store.id,
-                Email=self.customer.email,
-                FirstName=self.customer.first_name,
-                LastName=self.customer.last_name,
-                Phone=self.customer.phone,
-            )
-            for key in ("Products", "StoreID", "Address"):
-                if key not in self.data or not self.data[key]:
-                    raise Exception('order has invalid value for key "%s"' % key)
-
-            headers = {
-                "Content-Type": "application/json; charset=utf-8",
-                "Accept": "application/json",
-                "Referer": "https://order.dominos.ca/en/pages/order/",
-                "Origin": "https://order.dominos.ca",
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-                "DPZ-Language": "en",
-                "DPZ-Market": "CANADA",
-            }
-            r = _requests.post(url=url, headers=headers, json={"Order": self.data})
-            r.raise_for_status()
-            json_data = r.json()
-            if merge:
-                for key, value in json_data["Order"].items():
-                    if value or not isinstance(value, list):
-                        self.data[key] = value
-            return json_data
 
-        order._send = types.MethodType(_ca_send, order)
+def order_template(config: DominosConfig) -> OrderTemplate:
+    """Return the order template for the config, rebuilding it if the config changed."""
+    global _template
+    if _template is None or not _template.matches(config):
+        _template = OrderTemplate(config)
+    return _template
+
 
-    for item in state.cart:
-        for _ in range(item.quantity):
-            order.add_item(item.code, options=item.options if item.options else {})
+def _new_order(
+    state: ServerState, config: DominosConfig, menu: Optional[MenuEntry]
+) -> _Order:
+    """Empty pizzapi Order for the selected store and configured customer."""
+    return order_template(config).new_order(state.store_id, menu)
 
+
+async def _build_order(state: ServerState, config: DominosConfig) -> _Order:
+    """Build a pizzapi Order from current state and config, off the cached menu."""
+    menu = await get_menu_entry(state, config, state.store_id)
+    with span("order.build", cart_items=len(state.cart)):
+        order = _new_order(state, config, menu)
+        for code, options, qty in _cart_lines(state.cart):
+            order.add_item(code, qty=qty, options=options)
     return order
 
 
+def _cart_lines(cart: list[CartItem]) -> list[tuple[str, dict, int]]:
+    """Cart as (code, options, quantity) lines, merging identical code+options."""
+    lines: dict[tuple[str, str], list] = {}
+    for item in cart:
+        key = (item.code, json.dumps(item.options, sort_keys=True))
+        if key in lines:
+            lines[key][2] += item.quantity
+        else:
+            lines[key] = [item.code, item.options, item.quantity]
+    return [tuple(line) for line in lines.values()]
+
+
+_checks = SingleFlight()
+
+
+async def _checked_order(
+    state: ServerState,
+    config: DominosConfig,
+    priced: bool = False,
+    future_time: Optional[str] = None,
+) -> tuple[_Order, list[dict]]:
+    """Validated (or priced) order for the cart and the products as sent.
+
+    A check of identical content (store, cart, address, order type and
+    FutureOrderTime for a scheduled order) younger than the cache TTL is
+    reused instead of calling Domino's again; a priced entry also answers
+    a validate. The order returned is a private copy the caller may modify.
+    """
+    cache = order_cache.CHECKED_ORDERS
+    with span("order.check", priced=priced) as check_span:
+        key = order_cache.order_key(state, config, future_time)
+        entry = cache.get(key) if cache.is_fresh(key) else None
+        hit = entry is not None and (entry.priced or not priced)
+        metrics.CACHE_REQUESTS.inc("order_validation", "hit" if hit else "miss")
+        check_span.set(cached=hit)
+        if not hit:
+            entry = await _checks.run(
+                (key, priced),
+                lambda: _check_cart(state, config, key, priced, future_time),
+            )
+        order = _new_order(state, config, None)
+        order.data = copy.deepcopy(entry.data)
+        return order, copy.deepcopy(entry.products)
+
+
+async def _check_cart(
+    state: ServerState,
+    config: DominosConfig,
+    key: str,
+    priced: bool,
+    future_time: Optional[str] = None,
+) -> order_cache.CheckedOrder:
+    order = await _build_order(state, config)
+    if future_time:
+        order.data["FutureOrderTime"] = future_time
+    # Capture product pricing BEFORE the response overwrites Products
+    products = [dict(p) for p in order.data.get("Products", [])]
+    if priced:
+        await _price(order)
+    else:
+        await _validate(order)
+    entry = order_cache.CheckedOrder(
+        data=copy.deepcopy(order.data), products=products, priced=priced
+    )
+    order_cache.CHECKED_ORDERS.set(key, entry)
+    return entry
+
+
+async def _send(order: _Order, url: str, merge: bool) -> dict[str, Any]:
+    """POST the order to a Domino's endpoint over the shared client.
+
+    Replaces pizzapi's Order._send, which opened a new connection per call.
+    """
+    order.data.update(
+        StoreID=order.store.id,
+        Email=order.customer.email,
+        FirstName=order.customer.first_name,
+        LastName=order.customer.last_name,
+        Phone=order.customer.phone,
+    )
+    for key in ("Products", "StoreID", "Address"):
+        if key not in order.data or not order.data[key]:
+            raise Exception('order has invalid value for key "%s"' % key)
+
+    json_data = await get_client().send_order(url, order.data, order.country)
+    if merge:
+        for key, value in json_data["Order"].items():
+            if value or not isinstance(value, list):
+                order.data[key] = value
+    return json_data
+
+
+async def _validate(order: _Order) -> bool:
+    response = await _send(order, order.urls.validate_url(), True)
+    return response["Status"] != -1
+
+
+async def _price(order: _Order) -> None:
+    """Price the order in one round trip; Domino's validates it on the way."""
+    response = await _send(order, order.urls.price_url(), True)
+    if response["Status"] == -1:
+        raise Exception("get price failed: %r" % response)
+
+
+async def _place(order: _Order, card: PaymentObject) -> dict[str, Any]:
+    """Attach card payment to a priced order and place it (pizzapi's Order.place)."""
+    order.data["Payments"] = [
+        {
+            "Type": "CreditCard",
+            "Expiration": card.expiration,
+            "Amount": order.data["Amounts"].get("Customer", 0),
+            "CardType": card.card_type,
+            "Number": int(card.number),
+            "SecurityCode": int(card.cvv),
+            "PostalCode": card.zip,
+        }
+    ]
+    return await _send(order, order.urls.place_url(), False)
+
+
 def _audit_log(message: str) -> None:
-    """Append an entry to the audit log."""
-    try:
-        log_dir = os.path.dirname(LOG_PATH)
-        if log_dir:
-            os.makedirs(log_dir, exist_ok=True)
-        timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
-        with open(LOG_PATH, "a") as f:
-            f.write(f"{timestamp} | {message}\n")
-    except Exception as e:
-        logger.warning(f"Failed to write audit log: {e}")
+    """Queue an entry for the audit log; the file is written in the background."""
+    AUDIT_LOG.write(message)
 
 
 def _estimate_price_from_products(products: list, tax_rate: float = 0.15, delivery_fee: float = 4.99) -> dict:
@@ -123,6 +328,29 @@ def _estimate_price_from_products(products: list, tax_rate: float = 0.15, delive
     }
 
 
+def _pricing_from_amounts(data: dict) -> Optional[dict]:
+    """Exact totals from a Domino's price response, or None if it has none."""
+    amounts = data.get("Amounts") or {}
+    if "Customer" not in amounts:
+        return None
+    breakdown = data.get("AmountsBreakdown") or {}
+    return {
+        "subtotal": amounts.get("Menu", 0),
+        "tax": amounts.get("Tax", 0),
+        "delivery_fee": breakdown.get("DeliveryFee", amounts.get("Surcharge", 0)),
+        "discount": amounts.get("Discount", 0),
+        "total": amounts["Customer"],
+    }
+
+
+def _order_pricing(order: _Order, products: list[dict]) -> dict:
+    """Priced totals, falling back to the estimate if Domino's sent no amounts."""
+    with span("order.pricing"):
+        return _pricing_from_amounts(order.data) or _estimate_price_from_products(
+            products
+        )
+
+
 async def price_order(
     state: ServerState,
     config: DominosConfig,
@@ -144,13 +372,10 @@ async def price_order(
                 "code": "EMPTY_CART",
             }
 
-        order = _build_order(state, config)
-        # Capture product pricing BEFORE validate() overwrites Products
-        products_with_pricing = [dict(p) for p in order.data.get("Products", [])]
-        order.validate()
+        order, products_with_pricing = await _checked_order(state, config, priced=True)
 
         estimate = order.data.get("EstimatedWaitMinutes", "")
-        pricing = _estimate_price_from_products(products_with_pricing)
+        pricing = _order_pricing(order, products_with_pricing)
 
         return {
             "success": True,
@@ -185,8 +410,7 @@ async def validate_order(
                 "code": "EMPTY_CART",
             }
 
-        order = _build_order(state, config)
-        order.validate()
+        order, _ = await _checked_order(state, config)
 
         status = order.data.get("Status", -1)
         status_items = order.data.get("Order", {}).get("StatusItems", [])
@@ -257,8 +481,6 @@ async def place_order(
         }
 
     try:
-        order = _build_order(state, config)
-
         # Handle scheduled delivery
         formatted_scheduled = None
         if scheduled_time:
@@ -275,7 +497,6 @@ async def place_order(
                         "code": "SCHEDULED_TOO_SOON",
                     }
                 formatted_scheduled = dt.strftime("%Y-%m-%d %H:%M:%S")
-                order.data["FutureOrderTime"] = formatted_scheduled
             except ValueError:
                 _audit_log(
                     f"PLACE_ORDER | ABORTED | reason=INVALID_TIME | time={scheduled_time}"
@@ -286,14 +507,18 @@ async def place_order(
                     "code": "INVALID_TIME",
                 }
 
-        # Capture product pricing BEFORE validate() overwrites Products
-        products_with_pricing = [dict(p) for p in order.data.get("Products", [])]
-        order.validate()
-        # Re-apply CA overrides after validate() merges the response
+        # Priced (and validated) with the schedule it will be placed with. An
+        # ASAP order reuses a price of the same cart up to
+        # order_validation_ttl_seconds old, as price_order and validate_order do.
+        order, products_with_pricing = await _checked_order(
+            state, config, priced=True, future_time=formatted_scheduled
+        )
+
+        # Re-apply CA overrides after pricing merges the response
         if config.address.country.lower() == "ca":
             order.data["Market"] = "CANADA"
             order.data["SourceOrganizationURI"] = "order.dominos.ca"
-        pricing = _estimate_price_from_products(products_with_pricing)
+        pricing = _order_pricing(order, products_with_pricing)
         total = pricing["total"]
         if tip_amount > 0:
             total = round(total + tip_amount, 2)
@@ -319,7 +544,15 @@ async def place_order(
                 f"items={json.dumps(item_summary)} | estimated_total={total}"
                 + (f" | scheduled={formatted_scheduled}" if formatted_scheduled else "")
             )
+            await order_history.record(
+                state,
+                order_history.DRY_RUN,
+                total=total,
+                scheduled_for=formatted_scheduled,
+            )
+            order_cache.invalidate(state, config)
             state.cart.clear()
+            state.save()
             return {
                 "success": True,
                 "order_id": "DRY_RUN_NO_ORDER",
@@ -331,12 +564,12 @@ async def place_order(
 
         # Place the real order
         if config.payment.pay_at_door:
-            # Cash / pay at door — set payment manually and skip the price URL call
+            # Cash / pay at door — set payment manually; the order is already priced
             if tip_amount > 0:
                 order.data["Amounts"] = order.data.get("Amounts", {})
                 order.data["Amounts"]["Tip"] = tip_amount
             order.data["Payments"] = [{"Type": "Cash"}]
-            result = order._send(order.urls.place_url(), False)
+            result = await _send(order, order.urls.place_url(), False)
         else:
             card = PaymentObject(
                 config.payment.card_number,
@@ -347,7 +580,7 @@ async def place_order(
             if tip_amount > 0:
                 order.data["Amounts"] = order.data.get("Amounts", {})
                 order.data["Amounts"]["Tip"] = tip_amount
-            result = order.place(card)
+            result = await _place(order, card)
 
         # Check place result status
         if isinstance(result, dict) and result.get("Status") == -1:
@@ -368,8 +601,18 @@ async def place_order(
             + (f" | scheduled={formatted_scheduled}" if formatted_scheduled else "")
         )
 
+        await order_history.record(
+            state,
+            order_history.CONFIRMED,
+            order_id=order_id,
+            total=total,
+            scheduled_for=formatted_scheduled,
+        )
+
         # Clear cart after successful placement
+        order_cache.invalidate(state, config)
         state.cart.clear()
+        state.save()
 
         result: dict[str, Any] = {
             "success": True,
@@ -392,4 +635,5 @@ async def place_order(
     except Exception as e:
         logger.exception("Error placing order")
         _audit_log(f"PLACE_ORDER | ERROR | reason={e}")
+        await order_history.record(state, order_history.FAILED, error=str(e))
         return {"success": False, "error": str(e), "code": "PLACE_FAILED"}
@@ -1,12 +1,16 @@
-import json
 import logging
-from typing import Any, Optional
+import re
+from typing import Any
 
 from pizzapi import Address as PizzaAddress
-from pizzapi import Store
 
+from dominos_mcp import menu_store
+from dominos_mcp.client import get_client
 from dominos_mcp.config import DominosConfig
-from dominos_mcp.state import ServerState
+from dominos_mcp.state import MenuEntry, ServerState
+from dominos_mcp.store_lookup import STORE_LOOKUPS, is_available, prewarm
+from dominos_mcp.tracing import span
+from dominos_mcp.upstream import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -35,13 +39,16 @@ async def find_nearby_stores(
         country = config.address.country
 
         address = _make_address(s, c, r, p, country)
-        results = address.nearby_stores(service=order_type)
+        with span("store_lookup") as lookup_span:
+            results, status_stale = await STORE_LOOKUPS.lookup(
+                address.line1, address.line2, order_type, country
+            )
+            lookup_span.set(stores=len(results), status_stale=status_stale)
+        results = [d for d in results if is_available(d, order_type)]
 
-        # results is a list of Store objects
         stores = []
-        for store_obj in results[:5]:
-            d = store_obj.data
-            store_id = str(d.get("StoreID", store_obj.id))
+        for d in results[:5]:
+            store_id = str(d.get("StoreID"))
             is_open = d.get("IsOnlineNow", False) and d.get("AllowDeliveryOrders", False)
             service_info = d.get("ServiceMethodEstimatedWaitMinutes", {})
             delivery_info = service_info.get("Delivery", {})
@@ -64,16 +71,33 @@ async def find_nearby_stores(
         for store in stores:
             if store["is_open"]:
                 state.store_id = store["store_id"]
+                state.store_info = store
                 state.save()
                 break
 
-        return {"success": True, "stores": stores}
+        result: dict[str, Any] = {"success": True, "stores": stores}
+        if status_stale:
+            # Domino's could not be reached; open/closed and wait times are
+            # the last known values.
+            result["status_stale"] = True
+        return result
 
     except Exception as e:
         logger.exception("Error finding nearby stores")
         return {"success": False, "error": str(e), "code": "STORE_LOOKUP_FAILED"}
 
 
+async def prewarm_store_lookup(config: DominosConfig) -> None:
+    """Look up stores for the config address so the first call is a cache hit."""
+    a = config.address
+    address = _make_address(a.street, a.city, a.region, a.postal_code, a.country)
+    count = await prewarm(
+        address.line1, address.line2, config.preferences.order_type, a.country
+    )
+    if count is not None:
+        logger.info(f"Pre-warmed store lookup for the config address ({count} stores)")
+
+
 async def get_menu(
     state: ServerState,
     config: DominosConfig,
@@ -90,14 +114,7 @@ async def get_menu(
                 "code": "NO_STORE",
             }
 
-        # Check cache
-        if sid in state.menu_cache:
-            menu_data = state.menu_cache[sid]
-        else:
-            store = Store(data={"StoreID": sid}, country=config.address.country)
-            menu = store.get_menu()
-            menu_data = _parse_menu(menu)
-            state.menu_cache[sid] = menu_data
+        menu_data = (await get_menu_entry(state, config, sid)).categories
 
         if category != "All" and category in menu_data:
             filtered = {category: menu_data[category]}
@@ -113,19 +130,121 @@ async def get_menu(
         return {"success": False, "error": str(e), "code": "MENU_FETCH_FAILED"}
 
 
+async def get_menu_entry(
+    state: ServerState, config: DominosConfig, sid: str
+) -> MenuEntry:
+    """Return the cached menu for a store.
+
+    Only a cache miss waits on Domino's; an expired entry is served as-is
+    while the cache refreshes it in the background. After a restart the
+    first miss for a store is filled from the on-disk copy if there is one.
+    """
+    country = config.address.country
+    with span("menu.get", store_id=sid):
+        if sid not in state.menu_cache:
+            with span("menu.load_persisted"):
+                stored = await run_blocking(menu_store.load, sid)
+            if stored is not None:
+                entry, age = stored
+                state.menu_cache.set(sid, entry, age=age)
+        return await state.menu_cache.get_or_fetch(
+            sid, lambda: _fetch_menu_entry(sid, country)
+        )
+
+
+async def _fetch_menu_entry(sid: str, country: str) -> MenuEntry:
+    menu = await get_client().get_menu(sid, country)
+    with span("menu.parse"):
+        entry = await run_blocking(_build_menu_entry, menu)
+    with span("menu.persist"):
+        await run_blocking(menu_store.save, sid, entry)
+    return entry
+
+
+def _build_menu_entry(menu) -> MenuEntry:
+    """Parse a menu into categories and search rows; the index is built here too."""
+    variants = getattr(menu, "variants", None)
+    return MenuEntry(
+        categories=_parse_menu(menu),
+        search_items=_build_search_items(menu),
+        variants=dict(variants) if isinstance(variants, dict) else {},
+    )
+
+
+def _build_search_items(menu) -> list[dict]:
+    """Flatten menu variants into search rows."""
+    items: list[dict] = []
+    variants = menu.variants if hasattr(menu, "variants") else {}
+    if not isinstance(variants, dict):
+        variants = {}
+
+    for code, item in variants.items():
+        if not isinstance(item, dict):
+            continue
+        items.append(
+            {
+                "code": code,
+                "product_code": item.get("ProductCode", ""),
+                "name": item.get("Name", ""),
+                "category": item.get("ProductType", ""),
+                "price": item.get("Price", ""),
+                "description": item.get("Description", ""),
+            }
+        )
+    return items
+
+
+# Checked in order: the first category with a keyword in the item's product
+# type, name or tags wins.
+CATEGORY_KEYWORDS = {
+    "Pizza": ["Pizza"],
+    "Wings": ["Wings", "Wing"],
+    "Pasta": ["Pasta"],
+    "Bread": ["Bread", "Breadsticks"],
+    "Drinks": ["Drinks", "Beverage", "Coke", "Sprite"],
+    "Desserts": ["Desserts", "Dessert"],
+}
+
+_CATEGORY_NAMES = list(CATEGORY_KEYWORDS)
+_KEYWORD_RANK = {
+    kw.lower(): rank
+    for rank, keywords in enumerate(CATEGORY_KEYWORDS.values())
+    for kw in keywords
+}
+# A keyword containing another keyword of the same category ("wings" vs
+# "wing") can never change the result, so only the shortest forms go into
+# the pattern. findall reports non-overlapping matches; with these keywords
+# a match can only hide a lower-ranked one. benchmarks/bench_parse_menu.py
+# checks the result against the plain per-keyword scan.
+_MATCH_KEYWORDS = [
+    kw
+    for kw, rank in _KEYWORD_RANK.items()
+    if not any(o != kw and o in kw and r == rank for o, r in _KEYWORD_RANK.items())
+]
+_CATEGORY_RE = re.compile("|".join(re.escape(kw) for kw in _MATCH_KEYWORDS))
+_NO_CATEGORY = len(_CATEGORY_NAMES)
+
+
+def _best_rank(text: str) -> int:
+    return min(
+        (_KEYWORD_RANK[kw] for kw in _CATEGORY_RE.findall(text)), default=_NO_CATEGORY
+    )
+
+
+def _classify(name: str, product_type: str, tags: Any) -> str:
+    """Return the menu category for a variant with the precompiled keyword pattern."""
+    # NUL separator stops a keyword from matching across the two fields.
+    rank = _best_rank(f"{product_type}\0{name}".lower())
+    # Only the top category cannot be beaten by a keyword in the (long) tags.
+    if rank:
+        rank = min(rank, _best_rank(str(tags).lower()))
+    return _CATEGORY_NAMES[rank] if rank < _NO_CATEGORY else "Other"
+
+
 def _parse_menu(menu) -> dict[str, list[dict]]:
     """Parse pizzapi Menu object into categorized items."""
     categories: dict[str, list[dict]] = {}
 
-    category_map = {
-        "Pizza": ["Pizza"],
-        "Wings": ["Wings", "Wing"],
-        "Pasta": ["Pasta"],
-        "Bread": ["Bread", "Breadsticks"],
-        "Drinks": ["Drinks", "Beverage", "Coke", "Sprite"],
-        "Desserts": ["Desserts", "Dessert"],
-    }
-
     try:
         variants = menu.variants if hasattr(menu, "variants") else {}
         if not isinstance(variants, dict):
@@ -140,17 +259,7 @@ def _parse_menu(menu) -> dict[str, list[dict]]:
             product_type = item.get("ProductType", "")
             tags = item.get("Tags", {})
 
-            # Determine category
-            item_category = "Other"
-            for cat_name, keywords in category_map.items():
-                if any(
-                    kw.lower() in product_type.lower()
-                    or kw.lower() in name.lower()
-                    or kw.lower() in str(tags).lower()
-                    for kw in keywords
-                ):
-                    item_category = cat_name
-                    break
+            item_category = _classify(name, product_type, tags)
 
             if item_category not in categories:
                 categories[item_category] = []
@@ -211,7 +320,10 @@ async def search_menu_items(
     query: str,
     store_id: str = "",
 ) -> dict[str, Any]:
-    """Search for specific items in the store menu by name or description."""
+    """Search the store menu by name, product type, description or item code.
+
+    Tolerates typos; results are ranked by relevance score.
+    """
     try:
         sid = store_id or state.store_id or (str(config.preferences.preferred_store_id) if getattr(config.preferences, "preferred_store_id", None) else None)
         if not sid:
@@ -221,38 +333,23 @@ async def search_menu_items(
                 "code": "NO_STORE",
             }
 
-        store = Store(data={"StoreID": sid}, country=config.address.country)
-        menu = store.get_menu()
+        entry = await get_menu_entry(state, config, sid)
 
-        # Cache while we have it
-        if sid not in state.menu_cache:
-            state.menu_cache[sid] = _parse_menu(menu)
-
-        # Search through variants
         results = []
-        query_lower = query.lower()
-        variants = menu.variants if hasattr(menu, "variants") else {}
-        if not isinstance(variants, dict):
-            variants = {}
-
-        for code, item in variants.items():
-            if not isinstance(item, dict):
-                continue
-            name = item.get("Name", "")
-            description = item.get("Description", "")
-            if query_lower in name.lower() or query_lower in description.lower():
-                results.append(
-                    {
-                        "code": code,
-                        "name": name,
-                        "category": item.get("ProductType", ""),
-                        "price": item.get("Price", ""),
-                        "description": description,
-                    }
-                )
-
-        # Cap at 20 results
-        results = results[:20]
+        with span("menu.search", query=query):
+            hits = entry.index.search(query, limit=20)
+        for i, score in hits:
+            item = entry.search_items[i]
+            results.append(
+                {
+                    "code": item["code"],
+                    "name": item["name"],
+                    "category": item["category"],
+                    "price": item["price"],
+                    "description": item["description"],
+                    "score": round(score, 2),
+                }
+            )
 
         return {"success": True, "results": results, "result_count": len(results)}
 
@@ -0,0 +1,333 @@
+"""Lightweight request tracing: one trace per tool call, one span per stage.
+
+Every MCP tool call starts a root span (`TRACER.trace`) whose trace ID is
+the call's correlation ID; stages inside it (session load, order build,
+each Domino's request, pricing, serialization, ...) open child spans with
+`span(...)`. The current span lives in a context variable, so spans
+nest across awaits and into `run_blocking` threads without being passed
+around. When tracing is off, or no trace is active, `span` returns a
+shared no-op and costs one context-variable read. Background work that
+can outlive the call, such as stale-cache refreshes, starts in a fresh
+context and is not traced.
+
+A trace's spans are exported together once its root span ends: as JSON
+lines to a rotated file, or as OTLP/HTTP JSON to a collector (Jaeger,
+Tempo, the OpenTelemetry Collector, ...). TraceIdFilter stamps log
+records with the trace ID, so a slow trace can be matched to the
+warnings logged during it.
+"""
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+import httpx
+
+from dominos_mcp.audit import AuditLog
+
+logger = logging.getLogger(__name__)
+
+TRACE_PATH = "/data/traces.jsonl"
+
+_current: ContextVar[Optional["Span"]] = ContextVar("dominos_mcp_span", default=None)
+
+# W3C trace context: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def _new_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: list[Span] = []
+
+
+class Span:
+    """A timed stage of a traced tool call; use as a context manager."""
+
+    __slots__ = (
+        "name", "trace", "span_id", "parent_id", "attributes", "root",
+        "start", "duration", "error", "_t0", "_token",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace: _Trace,
+        parent_id: Optional[str],
+        attributes: dict[str, Any],
+        root: bool = False,
+    ):
+        self.name = name
+        self.trace = trace
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.root = root
+        self.error: Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.perf_counter() - self._t0
+        _current.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.trace.spans.append(self)
+        if self.root:
+            TRACER._finish(self)
+        return False
+
+    def to_dict(self) -> dict[str, Any]:
+        record = {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.attributes:
+            record["attributes"] = self.attributes
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    trace_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes: Any):
+    """Child span of the current span; a no-op outside a traced call."""
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    """Correlation ID of the traced call in progress, if any."""
+    parent = _current.get()
+    return parent.trace.trace_id if parent is not None else None
+
+
+class TraceIdFilter(logging.Filter):
+    """Sets `trace_id` on every record: the traced call's correlation ID, or "-"."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+class JsonlExporter:
+    """Appends each span as one JSON line, through a rotated background writer."""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.log = AuditLog(
+            path, max_bytes=max_bytes, backup_count=backup_count,
+            thread_name="dominos-traces",
+        )
+
+    def export(self, spans: list[Span]) -> None:
+        self.log.append(
+            "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        )
+
+    def close(self) -> None:
+        self.log.close()
+
+
+_STOP = object()
+
+
+class OtlpExporter:
+    """Posts traces to an OpenTelemetry collector as OTLP/HTTP JSON.
+
+    Traces are queued and sent in batches by a background thread; when
+    the collector is unreachable the batch is dropped with a warning.
+    """
+
+    MAX_BATCH = 64
+
+    def __init__(self, endpoint: str, service_name: str = "dominos-mcp"):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="dominos-otlp", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, spans: list[Span]) -> None:
+        self._queue.put([_otlp_span(s) for s in spans])
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        with httpx.Client(timeout=5.0) as http:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.MAX_BATCH:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = any(item is _STOP for item in batch)
+                spans = [s for item in batch if item is not _STOP for s in item]
+                if spans:
+                    self._post(http, spans)
+                if stop:
+                    return
+
+    def _post(self, http: httpx.Client, spans: list[dict]) -> None:
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [_otlp_attribute("service.name", self.service_name)]
+                    },
+                    "scopeSpans": [{"scope": {"name": "dominos_mcp"}, "spans": spans}],
+                }
+            ]
+        }
+        try:
+            http.post(self.url, json=body).raise_for_status()
+        except Exception as e:
+            logger.warning(f"Dropped {len(spans)} spans: collector at {self.url} failed: {e}")
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(s: Span) -> dict[str, Any]:
+    start = int(s.start * 1e9)
+    record = {
+        "traceId": s.trace.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 2 if s.root else 1,  # SERVER for the tool call, INTERNAL below
+        "startTimeUnixNano": str(start),
+        "endTimeUnixNano": str(start + int(s.duration * 1e9)),
+        "attributes": [_otlp_attribute(k, v) for k, v in s.attributes.items()],
+    }
+    if s.parent_id:
+        record["parentSpanId"] = s.parent_id
+    if s.error:
+        record["status"] = {"code": 2, "message": s.error}
+    return record
+
+
+class Tracer:
+    """Starts traces and hands finished ones to the configured exporter."""
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.slow_threshold = 0.0
+        self._settings: Optional[tuple] = None
+        self._exporter: Optional[JsonlExporter | OtlpExporter] = None
+
+    def configure(
+        self,
+        enabled: bool,
+        exporter: str = "jsonl",
+        path: str = TRACE_PATH,
+        otlp_endpoint: str = "",
+        sample_rate: float = 1.0,
+        slow_threshold_ms: float = 0.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+    ) -> None:
+        """Apply the tracing config; the exporter is only rebuilt when it changes."""
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold_ms / 1000
+        settings = (exporter, path, otlp_endpoint, max_bytes, backup_count)
+        if enabled and settings != self._settings:
+            self.close()
+            if exporter == "otlp":
+                self._exporter = OtlpExporter(otlp_endpoint)
+            else:
+                self._exporter = JsonlExporter(path, max_bytes, backup_count)
+            self._settings = settings
+            target = otlp_endpoint if exporter == "otlp" else path
+            logger.info(f"Tracing tool calls to {target}")
+        elif not enabled:
+            self.close()
+        self.enabled = enabled
+
+    def trace(self, name: str, traceparent: Optional[str] = None, **attributes: Any):
+        """Root span of a tool call; continues the caller's W3C `traceparent` if given."""
+        if not self.enabled or (
+            self.sample_rate < 1.0 and random.random() >= self.sample_rate
+        ):
+            return NOOP_SPAN
+        match = _TRACEPARENT.match(traceparent or "")
+        if match:
+            trace_id, parent_id = match.groups()
+        else:
+            trace_id, parent_id = _new_id(16), None
+        return Span(name, _Trace(trace_id), parent_id, attributes, root=True)
+
+    def _finish(self, root: Span) -> None:
+        exporter = self._exporter
+        if exporter is None or root.duration < self.slow_threshold:
+            return
+        try:
+            exporter.export(root.trace.spans)
+        except Exception as e:
+            logger.warning(f"Failed to export trace {root.trace.trace_id}: {e}")
+
+    def close(self) -> None:
+        """Flush and stop the exporter."""
+        exporter, self._exporter, self._settings = self._exporter, None, None
+        if exporter is not None:
+            exporter.close()
+
+
+# Process-wide; configured from the config's tracing section.
+TRACER = Tracer()
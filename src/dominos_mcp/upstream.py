@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_max_workers = DEFAULT_MAX_WORKERS
+_timeout = DEFAULT_TIMEOUT_SECONDS
+
+
+class UpstreamTimeout(Exception):
+    """Raised when a blocking upstream call does not finish within its timeout."""
+
+
+def configure(max_workers: int, timeout: float) -> None:
+    """Set pool size and default timeout for upstream calls.
+
+    Called once per process when the config is applied. The pool size only applies until the executor is first created.
+    """
+    global _max_workers, _timeout
+    _timeout = timeout
+    if _executor is None:
+        _max_workers = max(1, max_workers)
+    elif max_workers != _max_workers:
+        logger.warning(
+            f"Upstream pool already running with {_max_workers} workers; "
+            f"ignoring new size {max_workers}"
+        )
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_max_workers, thread_name_prefix="dominos-upstream"
+        )
+    return _executor
+
+
+async def run_blocking(
+    func: Callable[..., Any],
+    *args: Any,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> Any:
+    """Run a blocking pizzapi/requests call on the upstream pool.
+
+    The event loop keeps serving other sessions while the call runs. If it
+    takes longer than `timeout` seconds (default from `configure`), the
+    caller gets `UpstreamTimeout`; the worker thread itself cannot be
+    interrupted and is released once the underlying request returns.
+    The call runs in a copy of the caller's context, so tracing spans
+    opened in the thread nest under the caller's span.
+    """
+    loop = asyncio.get_running_loop()
+    limit = timeout if timeout is not None else _timeout
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(
+        _get_executor(), functools.partial(context.run, func, *args, **kwargs)
+    )
+    try:
+        return await asyncio.wait_for(future, limit)
+    except asyncio.TimeoutError:
+        name = getattr(func, "__qualname__", repr(func))
+        raise UpstreamTimeout(
+            f"Domino's API call {name} timed out after {limit:g}s"
+        ) from None
+
+
+
+class SingleFlight:
+    """Collapse identical concurrent upstream calls into one.
+
+    The first caller for a key starts the call; callers arriving while it
+    is in flight await the same future and get the same result or
+    exception. Nothing is kept once the call finishes, so this is not a
+    cache. A caller being cancelled does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._inflight[key] = future
+            future.add_done_callback(functools.partial(self._done, key))
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every waiter was cancelled.
+        if not future.cancelled():
+            future.exception()